@@ -1,6 +0,0 @@
--- SQLite
--- ALTER TABLE delivery
--- ADD COLUMN environment TEXT;
-
-ALTER TABLE origin
-ADD COLUMN name TEXT;
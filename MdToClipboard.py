@@ -1,13 +1,21 @@
-import win32clipboard
-import html2text
-import markdown
-from bs4 import BeautifulSoup
-from io import StringIO
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
 
 
-class MdToClipboard:
-    @staticmethod
-    def copy_to_clipboard(rtf_content: str, plain_text: str, html_content: str) -> bool:
+# Where copied reports go. Each backend takes the three flavours built for
+# OneNote: RTF, plain text and CF_HTML (HTML with the Windows clipboard
+# header), plus the bare HTML for platforms that take it as is.
+
+
+class Win32ClipboardBackend:
+    description = "clipboard"
+
+    def copy(self, rtf_content, plain_text, html_content, html_body):
+        import win32clipboard
+
         try:
             win32clipboard.OpenClipboard()
             win32clipboard.EmptyClipboard()
@@ -29,6 +37,124 @@ class MdToClipboard:
         finally:
             win32clipboard.CloseClipboard()
 
+
+class CommandClipboardBackend:
+    """Copies through wl-copy or xclip.
+
+    These tools offer a single type per copy, and a text/html copy cannot be
+    pasted into plain text fields. The plain text is copied unless html is
+    set, for pasting formatted into rich text editors.
+    """
+
+    description = "clipboard"
+
+    COMMANDS = {
+        "wl-copy": (["wl-copy", "--type", "text/plain;charset=utf-8"], ["wl-copy", "--type", "text/html"]),
+        "xclip": (["xclip", "-selection", "clipboard", "-t", "UTF8_STRING"], ["xclip", "-selection", "clipboard", "-t", "text/html"]),
+    }
+
+    def __init__(self, command, html=False):
+        self.command = command
+        self.html = html
+
+    def copy(self, rtf_content, plain_text, html_content, html_body):
+        text_command, html_command = self.COMMANDS[self.command]
+        command, content = (html_command, html_body) if self.html else (text_command, plain_text)
+        try:
+            subprocess.run(command, input=content.encode('utf-8'), check=True, timeout=10)
+        except (OSError, subprocess.SubprocessError) as e:
+            raise RuntimeError(f"Clipboard operation failed: {e}")
+
+
+class MemoryClipboardBackend:
+    """Keeps the last copy in memory, for tests and benchmarks."""
+
+    description = "memory"
+
+    def __init__(self):
+        self.contents = None
+
+    def copy(self, rtf_content, plain_text, html_content, html_body):
+        self.contents = {"rtf": rtf_content, "text": plain_text, "html": html_content}
+
+
+class FileClipboardBackend:
+    """Writes each flavour to report.rtf, report.txt and report.html in a directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.description = f"files in {directory}"
+
+    def copy(self, rtf_content, plain_text, html_content, html_body):
+        os.makedirs(self.directory, exist_ok=True)
+        for name, content in (("report.rtf", rtf_content), ("report.txt", plain_text), ("report.html", html_body)):
+            with open(os.path.join(self.directory, name), "w", encoding="utf-8") as f:
+                f.write(content)
+
+
+class StdoutClipboardBackend:
+    description = "standard output"
+
+    def copy(self, rtf_content, plain_text, html_content, html_body):
+        sys.stdout.write(plain_text)
+
+
+def find_clipboard_backend(name=None):
+    """Pick the backend named by name or $QTT_CLIPBOARD, or the first one this machine supports.
+
+    Names are win32, wl-copy, xclip, memory, stdout and file:<directory>;
+    wl-copy:html and xclip:html copy the HTML instead of the plain text.
+    Without a clipboard the report is written to files in the temp directory.
+    """
+    name = name or os.environ.get("QTT_CLIPBOARD")
+    if name == "win32":
+        return Win32ClipboardBackend()
+    if name in CommandClipboardBackend.COMMANDS:
+        return CommandClipboardBackend(name)
+    if name and name.endswith(":html") and name[:-len(":html")] in CommandClipboardBackend.COMMANDS:
+        return CommandClipboardBackend(name[:-len(":html")], html=True)
+    if name == "memory":
+        return MemoryClipboardBackend()
+    if name == "stdout":
+        return StdoutClipboardBackend()
+    if name and name.startswith("file:"):
+        return FileClipboardBackend(name[len("file:"):])
+    if name:
+        raise ValueError(f"Unknown clipboard backend: {name}")
+
+    if sys.platform == "win32":
+        return Win32ClipboardBackend()
+    if os.environ.get("WAYLAND_DISPLAY") and shutil.which("wl-copy"):
+        return CommandClipboardBackend("wl-copy")
+    if os.environ.get("DISPLAY") and shutil.which("xclip"):
+        return CommandClipboardBackend("xclip")
+    return FileClipboardBackend(os.path.join(tempfile.gettempdir(), "quick_task_tracker_report"))
+
+
+def html_to_plain_text(html_body):
+    import html2text
+
+    return html2text.html2text(html_body)
+
+
+def html_to_rtf(html_body):
+    from html_to_rtf import html_to_rtf
+
+    return html_to_rtf(html_body)
+
+
+class MdToClipboard:
+    backend = None  # Chosen on first copy, or set by the caller
+
+    @staticmethod
+    def get_backend():
+        if MdToClipboard.backend is None:
+            MdToClipboard.backend = find_clipboard_backend()
+        return MdToClipboard.backend
+
+    @staticmethod
+    def copy_to_clipboard(rtf_content: str, plain_text: str, html_content: str, html_body: str = "") -> bool:
+        MdToClipboard.get_backend().copy(rtf_content, plain_text, html_content, html_body)
         return True
 
     @staticmethod
@@ -51,44 +177,56 @@ class MdToClipboard:
 
     @staticmethod
     def html_to_rtf(html_body: str) -> str:
-        soup = BeautifulSoup(html_body, 'html.parser')
-        rtf = StringIO()
-        rtf.write(r"""{\rtf1\ansi\ansicpg1252\deff0\nouicompat{\fonttbl{\f0 Calibri;}}""")
-        rtf.write(r"{\*\generator Python;}viewkind4\uc1\pard ")
-
-        for tag in soup.find_all(['p']):
-            rtf.write(r"\pard ")
+        return html_to_rtf(html_body)
 
-            if tag.find('strong'):
-                rtf.write(r"\b ")
-            if tag.find('em'):
-                rtf.write(r"\i ")
+    @staticmethod
+    def render_for_onenote(html_body: str, executor=None, on_progress=None) -> tuple:
+        """Return (rtf, plain text, CF_HTML, html) of an HTML document, for copy_rendered.
+
+        With an executor, its workers render the plain text and the RTF side by
+        side while the CF_HTML is built here. on_progress(text) is told as each
+        format is ready.
+        """
+        def progress(text):
+            if on_progress:
+                on_progress(text)
+
+        if executor is None:
+            plain_text = html_to_plain_text(html_body)
+            progress("Plain text ready")
+            rtf_text = html_to_rtf(html_body)
+            progress("RTF ready")
+            return rtf_text, plain_text, MdToClipboard.create_html_with_fragment(html_body), html_body
+
+        from concurrent.futures import as_completed
+
+        plain_future = executor.submit(html_to_plain_text, html_body)
+        rtf_future = executor.submit(html_to_rtf, html_body)
+        futures = {plain_future: "Plain text", rtf_future: "RTF"}
+        html_text = MdToClipboard.create_html_with_fragment(html_body)
+        progress("HTML ready")
+        for future in as_completed(futures):
+            progress(f"{futures[future]} ready")
+        return rtf_future.result(), plain_future.result(), html_text, html_body
 
-            rtf.write(tag.get_text().replace('\n', ' '))
-            rtf.write(r" \par ")
+    @staticmethod
+    def render_html_for_onenote(html_body: str, executor=None, on_progress=None) -> tuple:
+        return MdToClipboard.render_for_onenote(f"<html><body>{html_body}</body></html>", executor, on_progress)
 
-        rtf.write(r"}")
-        return rtf.getvalue()
+    @staticmethod
+    def copy_rendered(rendered: tuple) -> bool:
+        return MdToClipboard.copy_to_clipboard(*rendered)
 
     @staticmethod
     def md_to_clipboard_for_onenote(markdown_text: str) -> bool:
-        html_body = f"<html><body>{markdown.markdown(markdown_text)}</body></html>"
+        import markdown
 
-        html_text = MdToClipboard.create_html_with_fragment(html_body)
-        plain_text = html2text.html2text(html_body)
-        rtf_text = MdToClipboard.html_to_rtf(html_body)
-
-        return MdToClipboard.copy_to_clipboard(rtf_text, plain_text, html_text)
+        html_body = f"<html><body>{markdown.markdown(markdown_text)}</body></html>"
+        return MdToClipboard.copy_rendered(MdToClipboard.render_for_onenote(html_body))
 
     @staticmethod
     def html_to_clipboard_for_onenote(html_body: str) -> bool:
-        html_body = f"<html><body>{html_body}</body></html>"
-
-        html_text = MdToClipboard.create_html_with_fragment(html_body)
-        plain_text = html2text.html2text(html_body)
-        rtf_text = MdToClipboard.html_to_rtf(html_body)
-
-        return MdToClipboard.copy_to_clipboard(rtf_text, plain_text, html_text)
+        return MdToClipboard.copy_rendered(MdToClipboard.render_html_for_onenote(html_body))
 
 if __name__ == "__main__":
     markdown_text = """
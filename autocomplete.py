@@ -0,0 +1,130 @@
+import bisect
+import threading
+
+
+# Columns offered as suggestions in the form comboboxes
+AUTOCOMPLETE_COLUMNS = {
+    "task": ("customer", "name", "description"),
+    "delivery": ("version", "server", "environment"),
+    "link": ("type",),
+    "tag": ("type", "keywords"),
+    "origin": ("name", "type"),
+    "booking": ("description",),
+}
+
+
+class ColumnIndex:
+    """Distinct values of one column, with how often and how recently each was used.
+
+    Values are kept sorted by their case-folded form, so prefix matches are a
+    binary search; substring matches scan the folded values in memory.
+    """
+
+    def __init__(self, rows=()):
+        self.stats = {}  # value -> [use count, recency]
+        self.keys = []   # sorted (folded value, value)
+        self.recency = 0
+        for value, count, recency in rows:
+            self.stats[value] = [count, recency]
+            self.keys.append((value.casefold(), value))
+            self.recency = max(self.recency, recency)
+        self.keys.sort()
+
+    def add(self, value):
+        self.recency += 1
+        if value in self.stats:
+            self.stats[value][0] += 1
+            self.stats[value][1] = self.recency
+        else:
+            self.stats[value] = [1, self.recency]
+            bisect.insort(self.keys, (value.casefold(), value))
+
+    def remove(self, value):
+        """Forget one use of value, and the value itself after its last use."""
+        if value not in self.stats:
+            return
+        self.stats[value][0] -= 1
+        if self.stats[value][0] <= 0:
+            del self.stats[value]
+            index = bisect.bisect_left(self.keys, (value.casefold(), value))
+            del self.keys[index]
+
+    def suggest(self, text, limit=None):
+        """Values containing text, prefix matches first, then by use count and recency."""
+        folded = text.casefold()
+
+        def rank(value):
+            count, recency = self.stats[value]
+            return (-count, -recency)
+
+        start = bisect.bisect_left(self.keys, (folded,))
+        prefix_matches = []
+        for key, value in self.keys[start:]:
+            if not key.startswith(folded):
+                break
+            prefix_matches.append(value)
+        prefix_matches.sort(key=rank)
+
+        other_matches = []
+        if folded:
+            other_matches = [value for key, value in self.keys if folded in key and not key.startswith(folded)]
+            other_matches.sort(key=rank)
+
+        matches = prefix_matches + other_matches
+        return matches[:limit] if limit else matches
+
+
+class Autocomplete:
+    """In-memory suggestion service for the form comboboxes.
+
+    Each column's index is built from the database the first time it is
+    asked for, then kept up to date by record() as rows are saved or edited, so typing
+    in a combobox never touches the database. invalidate() drops an index
+    after edits or deletes, to be rebuilt on next use.
+    """
+
+    def __init__(self, db, limit=100):
+        self.db = db
+        self.limit = limit
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _index(self, table, column):
+        if column not in AUTOCOMPLETE_COLUMNS.get(table, ()):
+            raise ValueError(f"No autocomplete for {table}.{column}")
+        with self._lock:
+            index = self._indexes.get((table, column))
+            if index is None:
+                rows = self.db.fetch_all(f"SELECT {column}, COUNT(*), MAX(id) FROM {table} WHERE {column} IS NOT NULL AND {column} != '' GROUP BY {column}")
+                index = self._indexes[(table, column)] = ColumnIndex(rows)
+            return index
+
+    def suggest(self, table, column, text):
+        index = self._index(table, column)
+        with self._lock:
+            return index.suggest(text, self.limit)
+
+    def record(self, table, previous=None, **values):
+        """Count the values of a row just saved into table.
+
+        For an edited row, previous maps its columns to the values it had
+        before: a changed value is counted once less, the new one once more.
+        """
+        with self._lock:
+            for column, value in values.items():
+                index = self._indexes.get((table, column))
+                if index is None:
+                    continue
+                if previous is not None:
+                    if previous.get(column) == value:
+                        continue
+                    if previous.get(column):
+                        index.remove(previous[column])
+                if value:
+                    index.add(value)
+
+    def invalidate(self, table=None):
+        with self._lock:
+            for key in list(self._indexes):
+                if table is None or key[0] == table:
+                    del self._indexes[key]
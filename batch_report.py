@@ -0,0 +1,149 @@
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from database import Database, load_db_path
+from report import ReportEngine
+
+
+# One report per customer, over each of its open root tasks with their whole
+# subtree, rendered by a pool of worker processes. Every worker opens the
+# database read-only and renders a customer at a time, so the batch scales
+# with the cores of the machine.
+
+BATCH_FORMATS = {"html": ".html", "md": ".md", "txt": ".txt"}
+
+_worker_db = None  # Read-only database of a worker process
+
+
+def customer_tasks(db, customers=None):
+    """Return {customer: task ids} of the open root tasks and their subtrees.
+
+    Roots come in id order, each followed by its subtasks. Without customers,
+    every customer with an open root task is included.
+    """
+    where = "r.task_id IS NULL AND (r.finished_at IS NULL OR r.finished_at = '') AND COALESCE(r.customer, '') != ''"
+    params = []
+    if customers:
+        where += f" AND r.customer IN ({', '.join('?' * len(customers))})"
+        params.extend(customers)
+    tasks = {}
+    for customer, task_id in db.fetch_all(f"""
+    SELECT r.customer, c.descendant
+    FROM task r
+    JOIN task_closure c ON c.ancestor = r.id
+    WHERE {where}
+    ORDER BY r.customer, r.id, c.depth, c.descendant""", params):
+        tasks.setdefault(customer, []).append(task_id)
+    return tasks
+
+
+def file_names(customers, fmt):
+    """Return {customer: file name}, made safe for any file system and unique."""
+    names = {}
+    used = set()
+    for customer in customers:
+        stem = re.sub(r"[^\w.-]+", "_", customer).strip("._") or "customer"
+        name = stem
+        number = 1
+        while name.lower() in used:
+            number += 1
+            name = f"{stem}_{number}"
+        used.add(name.lower())
+        names[customer] = name + BATCH_FORMATS[fmt]
+    return names
+
+
+def convert(html, fmt):
+    if fmt == "html":
+        return f"<html><body>{html}</body></html>"
+    import html2text
+
+    converter = html2text.HTML2Text()
+    converter.body_width = 0
+    # Plain text is the Markdown without its emphasis markers
+    converter.ignore_emphasis = fmt == "txt"
+    return converter.handle(html)
+
+
+def _open_worker_db(db_path):
+    global _worker_db
+    _worker_db = Database(db_path, reader_count=0, read_only=True)
+
+
+def render_customer(customer, task_ids, fmt, path):
+    """Render one customer's report to path in a worker; return (customer, path, tasks, seconds)."""
+    started = time.perf_counter()
+    # The cache is read but not written, the workers cannot write
+    html = ReportEngine(_worker_db, store=False).generate(task_ids)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(convert(html, fmt))
+    return customer, path, len(task_ids), time.perf_counter() - started
+
+
+class BatchReport:
+    """Writes one report file per customer into a directory, in parallel."""
+
+    def __init__(self, db_path, directory, fmt="html", workers=None):
+        if fmt not in BATCH_FORMATS:
+            raise ValueError(f"Cannot write reports as {fmt}")
+        self.db_path = db_path
+        self.directory = directory
+        self.fmt = fmt
+        self.workers = workers or os.cpu_count() or 1
+
+    def run(self, customers=None, on_progress=None):
+        """Render the reports and return [(customer, path, tasks, seconds)] by customer.
+
+        on_progress(result, done, total) is called as each report is written.
+        """
+        # Opening for writing first brings the schema up to date for the workers
+        db = Database(self.db_path, reader_count=0)
+        try:
+            tasks = customer_tasks(db, customers)
+        finally:
+            db.close()
+        if not tasks:
+            return []
+        os.makedirs(self.directory, exist_ok=True)
+        names = file_names(tasks, self.fmt)
+
+        results = []
+        workers = min(self.workers, len(tasks))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_open_worker_db, initargs=(self.db_path,)) as pool:
+            # Largest customers first, so no worker is left with a big one at the end
+            futures = [pool.submit(render_customer, customer, task_ids, self.fmt, os.path.join(self.directory, names[customer]))
+                       for customer, task_ids in sorted(tasks.items(), key=lambda item: -len(item[1]))]
+            for future in as_completed(futures):
+                results.append(future.result())
+                if on_progress:
+                    on_progress(results[-1], len(results), len(futures))
+        return sorted(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write one status report per customer over its open task trees.")
+    parser.add_argument("directory", help="output directory, one file per customer")
+    parser.add_argument("--customer", action="append", help="customer to report on, may be repeated; all by default")
+    parser.add_argument("--format", choices=list(BATCH_FORMATS), default="html")
+    parser.add_argument("--workers", type=int, help="worker processes, one per core by default")
+    parser.add_argument("--db", help="database file, defaults to the one in config.conf")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+
+    def show_progress(result, done, total):
+        customer, path, task_count, seconds = result
+        print(f"[{done}/{total}] {customer}: {task_count} tasks in {seconds * 1000:.0f} ms -> {path}")
+
+    results = BatchReport(args.db or load_db_path(), args.directory, args.format, args.workers).run(args.customer, show_progress)
+    if not results:
+        print("No open tasks to report on")
+    else:
+        print(f"{len(results)} reports written in {time.perf_counter() - started:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import time
+from io import StringIO
+
+from html_to_rtf import html_to_rtf
+
+
+# Compares the streaming converter with the BeautifulSoup one it replaced, on
+# generated reports shaped like the ones ReportEngine produces.
+
+
+def legacy_html_to_rtf(html_body):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html_body, 'html.parser')
+    rtf = StringIO()
+    rtf.write(r"""{\rtf1\ansi\ansicpg1252\deff0\nouicompat{\fonttbl{\f0 Calibri;}}""")
+    rtf.write(r"{\*\generator Python;}viewkind4\uc1\pard ")
+
+    for tag in soup.find_all(['p']):
+        rtf.write(r"\pard ")
+
+        if tag.find('strong'):
+            rtf.write(r"\b ")
+        if tag.find('em'):
+            rtf.write(r"\i ")
+
+        rtf.write(tag.get_text().replace('\n', ' '))
+        rtf.write(r" \par ")
+
+    rtf.write(r"}")
+    return rtf.getvalue()
+
+
+def make_report(root_tasks, subtasks=5, deliveries=4):
+    lines = []
+    for root in range(root_tasks):
+        lines.append(f"<p><strong>Customer {root % 40}</strong>: <code>Task n°{root} {{fix}}</code><p><ul>")
+        lines.append(f"    <li>Description: Root task {root} with some text, café & co</li>")
+        lines.append("    <li>Deliveries:</li><ul>")
+        lines.append(f"        <li>V 1.{root}, server{root % 3}:</li><ul>")
+        for delivery in range(deliveries):
+            lines.append(f"            <li>[x] ENV{delivery}, 2024.01.{delivery + 1:02d} 10h00")
+        lines.append("</ul></ul>")
+        lines.append(f"    <li><a href=\"https://tracker.example/{root}\">BCS: ticket {root}</a></li>")
+        for sub in range(subtasks):
+            lines.append(f"    <li>Sub-task: <code>Step {sub}</code></li><ul>")
+            lines.append(f"        <li>Description: subtask {sub} of {root}</li>")
+        lines.append("</ul>" * (subtasks + 1))
+    return f"<html><body>{chr(10).join(lines)}</body></html>"
+
+
+def best_of(repeat, function, argument):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function(argument)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the HTML to RTF conversion of generated reports.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000, 5000], help="root tasks per report")
+    parser.add_argument("--repeat", type=int, default=3)
+    # The unclosed <p> of the reports nest the whole document, which makes the
+    # BeautifulSoup converter quadratic: 200 tasks already take seconds
+    parser.add_argument("--legacy-limit", type=int, default=200, help="largest report also given to the BeautifulSoup converter")
+    args = parser.parse_args()
+
+    try:
+        import bs4  # noqa: F401
+        legacy = True
+    except ImportError:
+        legacy = False
+        print("bs4 is not installed, only timing the streaming converter")
+
+    for size in args.sizes:
+        html = make_report(size)
+        seconds, rtf = best_of(args.repeat, html_to_rtf, html)
+        line = f"{size:>6} tasks, {len(html) / 1024:>8.0f} KiB HTML: streaming {seconds * 1000:>8.1f} ms, {len(rtf) / 1024:.0f} KiB RTF"
+        if legacy and size <= args.legacy_limit:
+            legacy_seconds, legacy_rtf = best_of(args.repeat, legacy_html_to_rtf, html)
+            line += f" | BeautifulSoup {legacy_seconds * 1000:>8.1f} ms, {len(legacy_rtf) / 1024:.0f} KiB RTF ({legacy_seconds / seconds:.1f}x)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
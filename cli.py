@@ -0,0 +1,133 @@
+import argparse
+import sys
+from datetime import datetime
+
+from database import Database, load_db_path
+
+
+# Headless entry point for shell hooks and cron jobs. Only the database layer
+# is imported, the report module only when a report is asked for, so a
+# command starts without loading Tk or the clipboard libraries.
+
+
+def now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def add_task(db, args):
+    if args.parent is not None and not db.fetch_one("SELECT 1 FROM task WHERE id = ?", (args.parent,)):
+        raise SystemExit(f"No task with id {args.parent}")
+    cursor = db.execute_query("INSERT INTO task (customer, name, description, started_at, finished_at, task_id) VALUES (?, ?, ?, ?, ?, ?)",
+                              (args.customer, args.name, args.description, args.started_at or now(), None, args.parent))
+    print(cursor.lastrowid)
+
+
+def start_booking(db, args):
+    if not db.fetch_one("SELECT 1 FROM task WHERE id = ?", (args.task_id,)):
+        raise SystemExit(f"No task with id {args.task_id}")
+    origin_id = None
+    if args.origin:
+        origin = db.fetch_one("SELECT id FROM origin WHERE name = ? ORDER BY id DESC", (args.origin,))
+        if origin is None:
+            raise SystemExit(f"No origin named {args.origin!r}")
+        origin_id = origin[0]
+    cursor = db.execute_query("INSERT INTO booking (description, started_at, ended_at, duration, task_id, origin_id) VALUES (?, ?, NULL, '', ?, ?)",
+                              (args.description, now(), args.task_id, origin_id))
+    print(cursor.lastrowid)
+
+
+def stop_booking(db, args):
+    # Closes the most recent running booking, of the given task if any
+    where = "(ended_at IS NULL OR ended_at = '')"
+    params = []
+    if args.task_id is not None:
+        where += " AND task_id = ?"
+        params.append(args.task_id)
+    with db.transaction() as cursor:
+        booking = cursor.execute(f"SELECT id FROM booking WHERE {where} ORDER BY started_at_epoch DESC, id DESC LIMIT 1", params).fetchone()
+        if booking is None:
+            raise SystemExit("No running booking")
+        cursor.execute("UPDATE booking SET ended_at = ? WHERE id = ?", (now(), booking[0]))
+        # Fill in the duration text shown by the GUI from the computed minutes
+        cursor.execute("UPDATE booking SET duration = printf('%d:%02d', duration_minutes / 60, duration_minutes % 60) WHERE id = ? AND duration_minutes IS NOT NULL", (booking[0],))
+        minutes = cursor.execute("SELECT duration_minutes FROM booking WHERE id = ?", (booking[0],)).fetchone()[0]
+    print(f"{booking[0]}\t{minutes} min")
+
+
+def list_open(db, args):
+    where = "(finished_at IS NULL OR finished_at = '')"
+    params = []
+    if args.customer:
+        where += " AND customer = ?"
+        params.append(args.customer)
+    for row in db.fetch_all(f"SELECT id, task_id, customer, name, started_at FROM task WHERE {where} ORDER BY id", params):
+        print("\t".join("" if value is None else str(value) for value in row))
+
+
+def environment_rank(db, args):
+    # Reports list deliveries by rank, lowest first; unranked environments rank 0
+    if args.environment is not None:
+        if args.rank is None:
+            raise SystemExit("A rank is needed to set the rank of an environment")
+        db.set_environment_rank(args.environment, args.rank)
+    for environment, rank in db.fetch_environment_ranks():
+        print(f"{environment}\t{rank}")
+
+
+def report(db, args):
+    from report import ReportEngine
+
+    # A dict keeps the first occurrence of each id, in order
+    task_ids = {}
+    for task_id in args.task_ids:
+        task_ids.update(dict.fromkeys(db.fetch_task_descendants(task_id) if args.subtree else [task_id]))
+    print(ReportEngine(db).generate(list(task_ids)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Quick task tracker without the GUI.")
+    parser.add_argument("--db", help="database file, defaults to the one in config.conf")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("add-task", help="add a task and print its id")
+    command.add_argument("name")
+    command.add_argument("--customer", default="")
+    command.add_argument("--description", default="")
+    command.add_argument("--parent", type=int, help="id of the parent task, for a subtask")
+    command.add_argument("--started-at", help="ISO date and time, now by default")
+    command.set_defaults(run=add_task)
+
+    command = commands.add_parser("start", help="start a booking on a task and print its id")
+    command.add_argument("task_id", type=int)
+    command.add_argument("--description", default="")
+    command.add_argument("--origin", help="origin name")
+    command.set_defaults(run=start_booking)
+
+    command = commands.add_parser("stop", help="stop the running booking")
+    command.add_argument("task_id", type=int, nargs="?", help="only stop a booking of this task")
+    command.set_defaults(run=stop_booking)
+
+    command = commands.add_parser("list-open", help="list unfinished tasks: id, parent id, customer, name, start")
+    command.add_argument("--customer")
+    command.set_defaults(run=list_open)
+
+    command = commands.add_parser("env-rank", help="list the delivery environment ranks, or set one")
+    command.add_argument("environment", nargs="?")
+    command.add_argument("rank", type=int, nargs="?", help="deliveries of lower ranks come first in reports")
+    command.set_defaults(run=environment_rank)
+
+    command = commands.add_parser("report", help="print the HTML report of tasks")
+    command.add_argument("task_ids", type=int, nargs="+")
+    command.add_argument("--subtree", action="store_true", help="include every subtask")
+    command.set_defaults(run=report)
+
+    args = parser.parse_args(argv)
+    db = Database(args.db or load_db_path(), reader_count=0)
+    try:
+        args.run(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+import sqlite3
+import threading
+import queue
+from pathlib import Path
+from contextlib import contextmanager
+from migrations import MIGRATIONS, LATEST_VERSION
+
+
+# Relations shown next to the task list. Each query reads the ids to load
+# from the temp.selected_task table filled by Database.fetch_related().
+RELATION_QUERIES = {
+    "delivery": """
+        SELECT DISTINCT d.id, d.version, d.server, d.environment, d.delivery_date_time
+        FROM temp.selected_task s
+        JOIN task_delivery td ON td.task_id = s.id
+        JOIN delivery d ON d.id = td.delivery_id
+        ORDER BY d.id""",
+    "link": """
+        SELECT DISTINCT l.id, l.type, l.raw_link
+        FROM temp.selected_task s
+        JOIN task_link tl ON tl.task_id = s.id
+        JOIN link l ON l.id = tl.link_id
+        ORDER BY l.id""",
+    "tag": """
+        SELECT DISTINCT t.id, t.type, t.keywords
+        FROM temp.selected_task s
+        JOIN tag_task tt ON tt.task_id = s.id
+        JOIN tag t ON t.id = tt.tag_id
+        ORDER BY t.id""",
+    "origin": """
+        SELECT DISTINCT o.id, o.name, o.type, o.raw_link
+        FROM temp.selected_task s
+        JOIN task_origin t_o ON t_o.task_id = s.id
+        JOIN origin o ON o.id = t_o.origin_id
+        ORDER BY o.id""",
+    "booking": """
+        SELECT b.id, b.description, b.started_at, b.ended_at, b.duration
+        FROM temp.selected_task s
+        JOIN booking b ON b.task_id = s.id
+        ORDER BY b.id""",
+    "note": """
+        SELECT n.id, n.content
+        FROM temp.selected_task s
+        JOIN note n ON n.task_id = s.id
+        ORDER BY n.id""",
+}
+
+# Tables whose rows belong to a single task through their task_id, deleted
+# along with it
+TASK_ROW_TABLES = ("booking", "note", "task_delivery", "task_link", "tag_task", "task_origin")
+
+# Typed sort keys for the task list columns. They are never NULL, so they
+# also work in keyset comparisons; None keeps the creation order.
+TASK_SORT_KEYS = {
+    None: "id",
+    "customer": "COALESCE(customer, '') COLLATE NOCASE",
+    "name": "COALESCE(name, '') COLLATE NOCASE",
+    "description": "COALESCE(description, '') COLLATE NOCASE",
+    "started_at": "COALESCE(started_at_epoch, 0)",
+    "finished_at": "COALESCE(finished_at_epoch, 0)",
+}
+
+
+def task_sort_key(column):
+    if column not in TASK_SORT_KEYS:
+        raise ValueError(f"Cannot sort tasks by {column}")
+    return TASK_SORT_KEYS[column]
+
+
+def task_order_by(column, descending=False):
+    """ORDER BY terms for sorting tasks by column, ties broken by id."""
+    direction = "DESC" if descending else "ASC"
+    return f"{task_sort_key(column)} {direction}, id {direction}"
+
+
+def load_db_path(config_file_path="./config.conf"):
+    """Read the database file name from the first line of the config file."""
+    with open(config_file_path, "r") as f:
+        return f.readline().strip()
+
+
+class Database:
+    """Long-lived connection manager for the task database.
+
+    One writer connection serialises every write behind a lock, while a small
+    pool of reader connections serves the SELECTs. The database runs in WAL
+    mode so readers never wait on the writer, and every connection keeps its
+    own prepared-statement cache.
+
+    With read_only, every connection is opened read-only and the schema must
+    already be up to date, which suits worker processes that only report.
+    """
+
+    def __init__(self, db_path, reader_count=2, cached_statements=256, read_only=False):
+        self.db_path = db_path
+        self.cached_statements = cached_statements
+        self.read_only = read_only
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._writer = self._open_connection()
+        if read_only:
+            self.check_schema_version()
+        else:
+            self._writer.execute("PRAGMA journal_mode=WAL")
+            self.init_db()
+
+        # An in-memory database is private to its connection, so the readers
+        # would not see the writer's tables: route every read to the writer.
+        self._readers = queue.LifoQueue()
+        if db_path != ":memory:":
+            for _ in range(reader_count):
+                self._readers.put(self._open_connection())
+
+    def _open_connection(self):
+        if self.read_only:
+            conn = sqlite3.connect(f"{Path(self.db_path).resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False, isolation_level=None, cached_statements=self.cached_statements)
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, cached_statements=self.cached_statements)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # Database setup
+    def init_db(self):
+        self.migrate()
+
+    def schema_version(self):
+        return self._writer.execute("PRAGMA user_version").fetchone()[0]
+
+    def check_schema_version(self):
+        current = self.schema_version()
+        if current > LATEST_VERSION:
+            raise RuntimeError(f"Database {self.db_path} has schema version {current}, newer than this application ({LATEST_VERSION}).")
+        if self.read_only and current < LATEST_VERSION:
+            raise RuntimeError(f"Database {self.db_path} has schema version {current}, open it once for writing to upgrade it to {LATEST_VERSION}.")
+        return current
+
+    def migrate(self):
+        """Apply every migration newer than the database's user_version.
+
+        Each migration commits together with its version bump, so an
+        interrupted upgrade resumes from the last completed step.
+        """
+        current = self.check_schema_version()
+        for version, description, apply in MIGRATIONS:
+            if version <= current:
+                continue
+            with self.transaction() as cursor:
+                apply(cursor)
+                cursor.execute(f"PRAGMA user_version = {int(version)}")
+
+    def _in_transaction(self):
+        return getattr(self._local, "depth", 0) > 0
+
+    @contextmanager
+    def transaction(self):
+        """Run a block of writes atomically on the writer connection.
+
+        Yields a cursor; the transaction commits when the block exits and rolls
+        back if it raises. Nested blocks join the outermost transaction.
+        """
+        with self._write_lock:
+            depth = getattr(self._local, "depth", 0)
+            self._local.depth = depth + 1
+            cursor = self._writer.cursor()
+            try:
+                if depth == 0:
+                    cursor.execute("BEGIN IMMEDIATE")
+                yield cursor
+                if depth == 0:
+                    self._writer.commit()
+            except BaseException:
+                if depth == 0:
+                    self._writer.rollback()
+                raise
+            finally:
+                self._local.depth = depth
+
+    @contextmanager
+    def reader(self):
+        """Borrow a reader connection from the pool for a block of SELECTs.
+
+        Inside a transaction the writer is yielded instead, so the block sees
+        its own uncommitted changes.
+        """
+        if self._in_transaction() or self.db_path == ":memory:":
+            with self._write_lock:
+                yield self._writer
+            return
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._open_connection()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    def execute_query(self, query, params=None):
+        with self.transaction() as cursor:
+            cursor.execute(query, params or ())
+            return cursor
+
+    def fetch_all(self, query, params=None):
+        with self.reader() as conn:
+            return conn.execute(query, params or ()).fetchall()
+
+    def fetch_one(self, query, params=None):
+        with self.reader() as conn:
+            return conn.execute(query, params or ()).fetchone()
+
+    def fetch_task_tree(self, sort_column=None, descending=False):
+        """Return every task reachable from a root, in depth-first order.
+
+        Rows are (id, customer, name, description, started_at, finished_at,
+        task_id, depth). A parent always comes before its children, so the
+        rows can be streamed straight into a tree widget. Siblings are sorted
+        by sort_column at every level.
+        """
+        # Each task's rank among its siblings becomes one segment of its path
+        return self.fetch_all(f"""
+        WITH RECURSIVE ranked(id, seq) AS (
+            SELECT id, printf('%010d', ROW_NUMBER() OVER (PARTITION BY task_id ORDER BY {task_order_by(sort_column, descending)}))
+            FROM task
+        ),
+        tree(id, customer, name, description, started_at, finished_at, task_id, depth, path) AS (
+            SELECT t.id, t.customer, t.name, t.description, t.started_at, t.finished_at, t.task_id, 0, r.seq
+            FROM task t
+            JOIN ranked r ON r.id = t.id
+            WHERE t.task_id IS NULL
+            UNION ALL
+            SELECT t.id, t.customer, t.name, t.description, t.started_at, t.finished_at, t.task_id, tree.depth + 1, tree.path || '/' || r.seq
+            FROM task t
+            JOIN ranked r ON r.id = t.id
+            JOIN tree ON t.task_id = tree.id
+        )
+        SELECT id, customer, name, description, started_at, finished_at, task_id, depth
+        FROM tree
+        ORDER BY path""")
+
+    @contextmanager
+    def selected_tasks(self, task_ids):
+        """Borrow a reader whose temp.selected_task table holds task_ids.
+
+        Queries can then join against the selection instead of binding one
+        parameter per id, whatever the size of the selection.
+        """
+        with self.reader() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS selected_task (id INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM temp.selected_task")
+            conn.executemany("INSERT OR IGNORE INTO temp.selected_task (id) VALUES (?)", ((int(task_id),) for task_id in task_ids))
+            try:
+                yield conn
+            finally:
+                conn.execute("DELETE FROM temp.selected_task")
+
+    def fetch_task_children(self, parent_id=None, sort_column=None, descending=False):
+        """Return the direct subtasks of parent_id, or the root tasks for None.
+
+        Rows are (id, customer, name, description, started_at, finished_at,
+        task_id, child_count), sorted by sort_column.
+        """
+        return self.fetch_all(f"""
+        SELECT id, customer, name, description, started_at, finished_at, task_id, child_count
+        FROM task
+        WHERE task_id IS ?
+        ORDER BY {task_order_by(sort_column, descending)}""", (parent_id,))
+
+    def fetch_task_rollups(self, task_ids):
+        """Return {task id: (booked minutes, open subtasks)} over each task's whole subtree.
+
+        Booked minutes include the task's own bookings; open subtasks counts
+        the unfinished descendants at any depth.
+        """
+        with self.selected_tasks(task_ids) as conn:
+            return {row[0]: row[1:] for row in conn.execute("""
+            SELECT c.ancestor,
+                   COALESCE(SUM((SELECT SUM(b.duration_minutes) FROM booking b WHERE b.task_id = c.descendant)), 0),
+                   SUM(c.depth > 0 AND (t.finished_at IS NULL OR t.finished_at = ''))
+            FROM temp.selected_task s
+            JOIN task_closure c ON c.ancestor = s.id
+            JOIN task t ON t.id = c.descendant
+            GROUP BY c.ancestor""")}
+
+    def fetch_task_ancestors(self, task_id):
+        """Return the ids of the ancestors of task_id, root first."""
+        rows = self.fetch_all("SELECT ancestor FROM task_closure WHERE descendant = ? AND depth > 0 ORDER BY depth DESC", (task_id,))
+        return [row[0] for row in rows]
+
+    def fetch_task_descendants(self, task_id):
+        """Return the ids of task_id and all its subtasks, parents before children."""
+        rows = self.fetch_all("SELECT descendant FROM task_closure WHERE ancestor = ? ORDER BY depth, descendant", (task_id,))
+        return [row[0] for row in rows]
+
+    def delete_task_tree(self, task_id):
+        """Delete task_id with all its subtasks and return how many tasks were deleted.
+
+        Their bookings, notes and links to deliveries, links, tags and origins
+        go in the same transaction; the search triggers drop their documents.
+        """
+        subtree = "SELECT descendant FROM task_closure WHERE ancestor = ?"
+        with self.transaction() as cursor:
+            for table in TASK_ROW_TABLES:
+                cursor.execute(f"DELETE FROM {table} WHERE task_id IN ({subtree})", (task_id,))
+            cursor.execute(f"DELETE FROM task WHERE id IN ({subtree})", (task_id,))
+            return cursor.rowcount
+
+    def fetch_related(self, task_ids):
+        """Load every relation of a set of tasks with one query per relation.
+
+        Returns a dict mapping each key of RELATION_QUERIES to its
+        de-duplicated rows, ordered by id.
+        """
+        with self.selected_tasks(task_ids) as conn:
+            return {relation: conn.execute(query).fetchall() for relation, query in RELATION_QUERIES.items()}
+
+    @staticmethod
+    def match_expression(text):
+        """Turn free text into an FTS5 query: every word must appear, as a prefix."""
+        terms = ['"' + word.replace('"', '""') + '"*' for word in text.split()]
+        return " ".join(terms)
+
+    def search(self, text, limit=200):
+        """Ranked full-text search across tasks and everything attached to them.
+
+        Returns (source table, row id, owning task id, snippet) tuples, best
+        match first.
+        """
+        expression = self.match_expression(text)
+        if not expression:
+            return []
+        return self.fetch_all("""
+        SELECT d.source, d.source_id, d.task_id, snippet(search_fts, 0, '[', ']', '...', 12)
+        FROM search_fts
+        JOIN search_document d ON d.id = search_fts.rowid
+        WHERE search_fts MATCH ?
+        ORDER BY rank
+        LIMIT ?""", (expression, limit))
+
+    def set_environment_rank(self, environment, rank):
+        self.execute_query("INSERT OR REPLACE INTO environment_rank (environment, rank) VALUES (?, ?)", (environment, rank))
+
+    def fetch_environment_ranks(self):
+        return self.fetch_all("SELECT environment, rank FROM environment_rank ORDER BY rank, environment")
+
+    def get_setting(self, key, default=None):
+        result = self.fetch_one("SELECT value FROM settings WHERE key = ?", (key,))
+        return result[0] if result else default
+
+    def set_setting(self, key, value):
+        self.execute_query("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+
+    def save_theme(self, theme):
+        self.set_setting("theme", theme)
+
+    def get_theme(self):
+        return self.get_setting("theme")
+
+    def close(self):
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+        with self._write_lock:
+            self._writer.close()
@@ -0,0 +1,165 @@
+import argparse
+import csv
+import json
+import os
+import sys
+
+from database import Database, load_db_path
+
+
+# Tables written by a full export, parents before the tables referring to them
+EXPORT_TABLES = (
+    "task", "delivery", "task_delivery", "link", "task_link", "tag", "tag_task", "tag_link",
+    "origin", "task_origin", "booking", "note", "environment_rank", "settings",
+)
+
+EXPORT_FORMATS = ("jsonl", "csv")
+
+# Source columns of the tables that also hold derived ones (epochs, child
+# counts, stamps, minutes), which the triggers rebuild from these. Tasks and
+# bookings are written with the columns importer.IMPORT_COLUMNS reads.
+EXPORT_COLUMNS = {
+    "task": ("id", "customer", "name", "description", "started_at", "finished_at", "task_id AS parent_id"),
+    "delivery": ("id", "version", "server", "environment", "delivery_date_time"),
+    "booking": ("id", "task_id", "description", "started_at", "ended_at", "duration", "origin_id"),
+}
+
+# Parent tasks before their subtasks, so each one's parent is already there
+# when the file is imported
+EXPORT_ORDER = {
+    "task": "(SELECT MAX(depth) FROM task_closure WHERE descendant = task.id), id",
+}
+
+# Rows of each table belonging to a task subtree; ? is the subtree's root id
+SUBTREE = "SELECT descendant FROM task_closure WHERE ancestor = ?"
+SUBTREE_FILTERS = {
+    "task": f"id IN ({SUBTREE})",
+    "delivery": f"id IN (SELECT delivery_id FROM task_delivery WHERE task_id IN ({SUBTREE}))",
+    "task_delivery": f"task_id IN ({SUBTREE})",
+    "link": f"id IN (SELECT link_id FROM task_link WHERE task_id IN ({SUBTREE}))",
+    "task_link": f"task_id IN ({SUBTREE})",
+    "tag": f"id IN (SELECT tag_id FROM tag_task WHERE task_id IN ({SUBTREE}))",
+    "tag_task": f"task_id IN ({SUBTREE})",
+    "origin": f"id IN (SELECT origin_id FROM task_origin WHERE task_id IN ({SUBTREE}) UNION SELECT origin_id FROM booking WHERE task_id IN ({SUBTREE}))",
+    "task_origin": f"task_id IN ({SUBTREE})",
+    "booking": f"task_id IN ({SUBTREE})",
+    "note": f"task_id IN ({SUBTREE})",
+}
+
+
+def fetch_batches(cursor, batch_size):
+    """Yield the rows of an executed cursor batch_size at a time."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+class Exporter:
+    """Streams tables, or one task subtree with its relations, to JSONL or CSV files.
+
+    Each table goes to <directory>/<table>.<format>. Rows are read with
+    fetchmany and written as they come, so memory use does not grow with the
+    database. Everything is read in one transaction, giving a consistent
+    snapshot while the application keeps writing.
+    """
+
+    def __init__(self, db, batch_size=500):
+        self.db = db
+        self.batch_size = batch_size
+
+    def export(self, directory, fmt="jsonl", tables=None, task_id=None, on_progress=None):
+        """Write the tables to directory and return {table: rows written}.
+
+        With task_id, only the subtree of that task is written. on_progress is
+        called as on_progress(table, rows written, rows in table).
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Cannot export to {fmt}")
+        if task_id is not None:
+            tables = [table for table in (tables or EXPORT_TABLES) if table in SUBTREE_FILTERS]
+        tables = tables or EXPORT_TABLES
+        for table in tables:
+            if table not in EXPORT_TABLES:
+                raise ValueError(f"Cannot export {table}")
+        os.makedirs(directory, exist_ok=True)
+
+        counts = {}
+        with self.db.reader() as conn:
+            snapshot = not conn.in_transaction
+            if snapshot:
+                conn.execute("BEGIN")
+            try:
+                for table in tables:
+                    path = os.path.join(directory, f"{table}.{fmt}")
+                    counts[table] = self._export_table(conn, table, path, fmt, task_id, on_progress)
+            finally:
+                if snapshot:
+                    conn.execute("COMMIT")
+        return counts
+
+    def _export_table(self, conn, table, path, fmt, task_id, on_progress):
+        if task_id is None:
+            where, params = "", ()
+        else:
+            where = f"WHERE {SUBTREE_FILTERS[table]}"
+            params = (task_id,) * where.count("?")
+        total = conn.execute(f"SELECT COUNT(*) FROM {table} {where}", params).fetchone()[0]
+        selected = ", ".join(EXPORT_COLUMNS.get(table, ("*",)))
+        cursor = conn.execute(f"SELECT {selected} FROM {table} {where} ORDER BY {EXPORT_ORDER.get(table, 'rowid')}", params)
+        columns = [column[0] for column in cursor.description]
+
+        def on_batch(written):
+            if on_progress:
+                on_progress(table, written, total)
+
+        write = self._write_jsonl if fmt == "jsonl" else self._write_csv
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            return write(f, columns, fetch_batches(cursor, self.batch_size), on_batch)
+
+    def _write_jsonl(self, f, columns, batches, on_batch):
+        written = 0
+        for rows in batches:
+            f.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows)
+            written += len(rows)
+            on_batch(written)
+        on_batch(written)
+        return written
+
+    def _write_csv(self, f, columns, batches, on_batch):
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        written = 0
+        for rows in batches:
+            writer.writerows(rows)
+            written += len(rows)
+            on_batch(written)
+        on_batch(written)
+        return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the task database, or one task subtree, to JSONL or CSV files.")
+    parser.add_argument("directory", help="output directory, one file per table")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default="jsonl")
+    parser.add_argument("--task", type=int, help="only export the subtree of this task id")
+    parser.add_argument("--table", action="append", choices=EXPORT_TABLES, help="table to export, may be repeated; all by default")
+    parser.add_argument("--db", help="database file, defaults to the one in config.conf")
+    args = parser.parse_args()
+
+    def show_progress(table, done, total):
+        print(f"\r{table}: {done}/{total}", end="", file=sys.stderr, flush=True)
+
+    db = Database(args.db or load_db_path())
+    try:
+        counts = Exporter(db).export(args.directory, args.format, args.table, args.task, show_progress)
+        print(file=sys.stderr)
+        for table, count in counts.items():
+            print(f"{table}: {count} rows")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
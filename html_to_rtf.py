@@ -0,0 +1,226 @@
+import re
+from html.parser import HTMLParser
+from io import StringIO
+
+
+# Calibri 11pt body, Consolas for code, blue for links
+RTF_HEADER = (
+    r"{\rtf1\ansi\ansicpg1252\deff0\nouicompat"
+    r"{\fonttbl{\f0\fnil\fcharset0 Calibri;}{\f1\fmodern\fcharset0 Consolas;}}"
+    r"{\colortbl ;\red5\green99\blue193;}"
+    r"{\*\generator quick_task_tracker;}\viewkind4\uc1\f0\fs22" "\n"
+)
+
+# Character formatting opened by an inline tag, closed with "}"
+INLINE_GROUPS = {
+    "b": r"{\b ", "strong": r"{\b ",
+    "i": r"{\i ", "em": r"{\i ",
+    "u": r"{\ul ", "s": r"{\strike ", "del": r"{\strike ",
+    "code": r"{\f1 ", "kbd": r"{\f1 ", "tt": r"{\f1 ",
+}
+
+HEADING_SIZES = {"h1": 32, "h2": 28, "h3": 26, "h4": 24, "h5": 22, "h6": 22}
+
+BLOCK_TAGS = {"p", "div", "pre", "blockquote", "table", "tr", "section", "article", "header", "footer"}
+
+SKIPPED_TAGS = {"head", "style", "script", "title"}
+
+LIST_INDENT = 360  # twips per nesting level, a quarter inch
+
+_RTF_ESCAPES = {ord("\\"): "\\\\", ord("{"): "\\{", ord("}"): "\\}", ord("\t"): "\\tab "}
+_WHITESPACE = re.compile(r"\s+")
+
+
+def escape_rtf(text):
+    """Escape RTF control characters, and non-ASCII characters as \\uN? keywords."""
+    text = text.translate(_RTF_ESCAPES)
+    if text.isascii():
+        return text
+    parts = []
+    for char in text:
+        if char < "\x80":
+            parts.append(char)
+            continue
+        # \u takes a signed 16-bit value, characters past the BMP take two
+        encoded = char.encode("utf-16-le")
+        for index in range(0, len(encoded), 2):
+            unit = int.from_bytes(encoded[index:index + 2], "little", signed=True)
+            parts.append(f"\\u{unit}?")
+    return "".join(parts)
+
+
+class HtmlToRtf(HTMLParser):
+    """Converts HTML to RTF in one pass while it is fed.
+
+    Paragraphs, headings, nested ordered and unordered lists, links, code,
+    bold, italic and line breaks are kept. Paragraphs are only written once
+    they get text, so empty <p> and <li> around nested lists leave no blank
+    lines, and unclosed <li> and <p>, as in the reports, are fine. Output goes
+    to out as it is produced.
+    """
+
+    def __init__(self, out=None):
+        super().__init__(convert_charrefs=True)
+        self.out = out if out is not None else StringIO()
+        self._write = self.out.write
+        self._write(RTF_HEADER)
+        self.lists = []  # [tag, items so far] of each open list
+        self.groups = []  # (tag, opening text, closing text) of open formatting
+        self.pending = None  # paragraph properties waiting for text
+        self.in_paragraph = False
+        self.after_space = True
+        self.pre_depth = 0
+        self.skip_depth = 0
+
+    # Paragraphs
+
+    def _indent(self, depth):
+        return f"\\li{depth * LIST_INDENT}" if depth else ""
+
+    def _new_paragraph(self, properties=None):
+        self._end_paragraph()
+        self.pending = properties
+
+    def _open_paragraph(self):
+        properties = self.pending
+        if properties is None:
+            properties = f"\\pard{self._indent(len(self.lists))} "
+        self._write(properties)
+        for tag, opening, closing in self.groups:
+            self._write(opening)
+        self.pending = None
+        self.in_paragraph = True
+        self.after_space = True
+
+    def _end_paragraph(self):
+        if self.in_paragraph:
+            for tag, opening, closing in reversed(self.groups):
+                self._write(closing)
+            self._write("\\par\n")
+            self.in_paragraph = False
+        self.pending = None
+
+    def _line_break(self):
+        if not self.in_paragraph:
+            self._open_paragraph()
+        self._write("\\line ")
+        self.after_space = True
+
+    # Character formatting
+
+    def _open_group(self, tag, opening, closing="}"):
+        self.groups.append((tag, opening, closing))
+        if self.in_paragraph:
+            self._write(opening)
+
+    def _close_group(self, tag):
+        # Close up to the matching tag, ignoring stray end tags
+        if not any(group[0] == tag for group in self.groups):
+            return
+        while self.groups:
+            group_tag, opening, closing = self.groups.pop()
+            if self.in_paragraph:
+                self._write(closing)
+            if group_tag == tag:
+                return
+
+    # Parser events
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag in INLINE_GROUPS:
+            self._open_group(tag, INLINE_GROUPS[tag])
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                # A quote would end the field's URL argument, percent-encode it
+                href = href.replace('"', "%22")
+                self._open_group("a", f'{{\\field{{\\*\\fldinst{{HYPERLINK "{escape_rtf(href)}"}}}}{{\\fldrslt{{\\ul\\cf1 ', "}}}")
+            else:
+                self._open_group("a", "{")
+        elif tag in ("ul", "ol"):
+            self._end_paragraph()
+            self.lists.append([tag, 0])
+        elif tag == "li":
+            depth = max(len(self.lists), 1)
+            if self.lists and self.lists[-1][0] == "ol":
+                self.lists[-1][1] += 1
+                marker = f"{self.lists[-1][1]}."
+            else:
+                marker = "\\bullet"
+            self._new_paragraph(f"\\pard{self._indent(depth)}\\fi-{LIST_INDENT} {marker}\\tab ")
+        elif tag in HEADING_SIZES:
+            self._new_paragraph(f"\\pard\\sb120\\sa60{self._indent(len(self.lists))} ")
+            self._open_group(tag, f"{{\\b\\fs{HEADING_SIZES[tag]} ")
+        elif tag in BLOCK_TAGS:
+            self._new_paragraph()
+            if tag == "pre":
+                self.pre_depth += 1
+                self._open_group(tag, r"{\f1 ")
+        elif tag == "br":
+            self._line_break()
+        elif tag in ("td", "th") and self.in_paragraph:
+            self._write("\\tab ")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == "br":
+            self._line_break()
+        elif tag == "hr":
+            self._new_paragraph()
+        else:
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth = max(self.skip_depth - 1, 0)
+        elif tag in INLINE_GROUPS or tag == "a":
+            self._close_group(tag)
+        elif tag in ("ul", "ol"):
+            self._end_paragraph()
+            if self.lists:
+                self.lists.pop()
+        elif tag in HEADING_SIZES:
+            self._close_group(tag)
+            self._end_paragraph()
+        elif tag in BLOCK_TAGS or tag == "li":
+            if tag == "pre":
+                self._close_group(tag)
+                self.pre_depth = max(self.pre_depth - 1, 0)
+            self._end_paragraph()
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        if self.pre_depth:
+            if not self.in_paragraph:
+                self._open_paragraph()
+            self._write("\\line ".join(escape_rtf(line) for line in data.split("\n")))
+            return
+
+        text = _WHITESPACE.sub(" ", data)
+        if self.after_space or not self.in_paragraph:
+            text = text.lstrip(" ")
+        if not text:
+            return
+        if not self.in_paragraph:
+            self._open_paragraph()
+        self._write(escape_rtf(text))
+        self.after_space = text.endswith(" ")
+
+    def close(self):
+        super().close()
+        self._end_paragraph()
+        self.groups.clear()
+        self._write("}")
+
+    def getvalue(self):
+        return self.out.getvalue()
+
+
+def html_to_rtf(html_body, out=None):
+    """Return html_body as an RTF document, or write it to out and return out."""
+    converter = HtmlToRtf(out)
+    converter.feed(html_body)
+    converter.close()
+    return converter.getvalue() if out is None else out
@@ -0,0 +1,267 @@
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from database import Database, load_db_path
+
+
+# Columns read from an import file for each table. Parent tasks, tasks and
+# origins are referred to by name (their natural key), or by id with the
+# *_id columns. An id column keeps the ids of the rows, so the task and
+# booking files of an export can be imported back.
+IMPORT_COLUMNS = {
+    "task": ("id", "customer", "name", "description", "started_at", "finished_at", "parent", "parent_id"),
+    "booking": ("id", "task", "task_id", "description", "started_at", "ended_at", "duration", "origin", "origin_id"),
+    "delivery": ("id", "task", "task_id", "version", "server", "environment", "delivery_date_time"),
+}
+
+DATE_COLUMNS = ("started_at", "finished_at", "ended_at", "delivery_date_time")
+
+
+class RejectedRow(Exception):
+    pass
+
+
+class ImportResult:
+    def __init__(self, table):
+        self.table = table
+        self.read = 0
+        self.inserted = 0
+        self.rejected = []  # (line number, reason, row)
+        self.seconds = 0.0
+
+    def rows_per_second(self):
+        return self.inserted / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        return f"{self.inserted} {self.table} rows imported, {len(self.rejected)} rejected in {self.seconds:.1f} s ({self.rows_per_second():.0f} rows/s)"
+
+
+def read_rows(path):
+    """Yield (line number, row dict) from a CSV file with a header line, or a JSONL file."""
+    if os.path.splitext(path)[1].lower() in (".jsonl", ".ndjson", ".json"):
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as error:
+                    yield line_number, error
+                    continue
+                yield line_number, row if isinstance(row, dict) else ValueError("not a JSON object")
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+
+
+class Importer:
+    """Streams rows from CSV or JSONL files into the database.
+
+    Rows are validated and resolved one by one, then written with executemany
+    in transactions of chunk_size rows. Ids are handed out by the importer so
+    a row can name a parent task imported earlier in the same file. A bad
+    row is rejected with its line number and reason, the rest of the batch
+    goes on.
+    """
+
+    def __init__(self, db, chunk_size=1000):
+        self.db = db
+        self.chunk_size = chunk_size
+        self._ids_by_name = {}
+
+    def _names(self, table):
+        # Most recent id for each name, loaded on first use
+        if table not in self._ids_by_name:
+            self._ids_by_name[table] = {name: row_id for name, row_id in self.db.fetch_all(f"SELECT name, MAX(id) FROM {table} WHERE name IS NOT NULL GROUP BY name")}
+        return self._ids_by_name[table]
+
+    def _resolve(self, table, row, name_column, id_column, required):
+        name = row.get(name_column)
+        row_id = row.get(id_column)
+        if row_id not in (None, ""):
+            try:
+                row_id = int(row_id)
+            except (TypeError, ValueError):
+                raise RejectedRow(f"{id_column} is not a number: {row_id}")
+            if not self.db.fetch_one(f"SELECT 1 FROM {table} WHERE id = ?", (row_id,)):
+                raise RejectedRow(f"no {table} with id {row_id}")
+            return row_id
+        if name not in (None, ""):
+            if name not in self._names(table):
+                raise RejectedRow(f"no {table} named {name!r}")
+            return self._names(table)[name]
+        if required:
+            raise RejectedRow(f"{name_column} or {id_column} is required")
+        return None
+
+    def _clean(self, row):
+        values = {}
+        for column, value in row.items():
+            if value is not None and not isinstance(value, str):
+                value = str(value)
+            value = value.strip() if value else value
+            if column in DATE_COLUMNS:
+                try:
+                    value = datetime.fromisoformat(value).isoformat(timespec="seconds") if value else None
+                except ValueError:
+                    raise RejectedRow(f"{column} is not an ISO date: {value}")
+            values[column] = value
+        return values
+
+    def _prepare(self, table, row):
+        """Return the values to insert for one cleaned row, or raise RejectedRow.
+
+        The row's id comes first, None when the importer is to hand one out.
+        """
+        row_id = row.get("id")
+        if row_id not in (None, ""):
+            try:
+                row_id = int(row_id)
+            except ValueError:
+                raise RejectedRow(f"id is not a number: {row_id}")
+        else:
+            row_id = None
+        if table == "task":
+            if not row.get("name"):
+                raise RejectedRow("name is required")
+            parent_id = self._resolve("task", row, "parent", "parent_id", required=False)
+            return (row_id, row.get("customer") or "", row["name"], row.get("description") or "", row.get("started_at"), row.get("finished_at"), parent_id)
+        if table == "booking":
+            task_id = self._resolve("task", row, "task", "task_id", required=True)
+            origin_id = self._resolve("origin", row, "origin", "origin_id", required=False)
+            return (row_id, row.get("description") or "", row.get("started_at"), row.get("ended_at"), row.get("duration") or "", task_id, origin_id)
+        task_id = self._resolve("task", row, "task", "task_id", required=True)
+        if not row.get("version"):
+            raise RejectedRow("version is required")
+        return (row_id, task_id, row["version"], row.get("server") or "", row.get("environment") or "", row.get("delivery_date_time"))
+
+    def _next_id(self, cursor, table):
+        # AUTOINCREMENT never reuses ids, so continue after the sequence
+        row = cursor.execute(f"SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = '{table}'), 0), COALESCE((SELECT MAX(id) FROM {table}), 0))").fetchone()
+        return row[0] + 1
+
+    def _with_ids(self, cursor, table, rows):
+        # Hand out ids past the table's and past those the rows bring along
+        next_id = max([self._next_id(cursor, table)] + [values[0] + 1 for values in rows if values[0] is not None])
+        with_ids = []
+        for values in rows:
+            if values[0] is None:
+                values = (next_id, *values[1:])
+                next_id += 1
+            with_ids.append(values)
+        return with_ids
+
+    def _write(self, cursor, table, rows):
+        if table == "task":
+            cursor.executemany("INSERT INTO task (id, customer, name, description, started_at, finished_at, task_id) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        elif table == "booking":
+            cursor.executemany("INSERT INTO booking (id, description, started_at, ended_at, duration, task_id, origin_id) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        else:
+            cursor.executemany("INSERT INTO delivery (id, version, server, environment, delivery_date_time) VALUES (?, ?, ?, ?, ?)", [(row[0], *row[2:]) for row in rows])
+            cursor.executemany("INSERT INTO task_delivery (task_id, delivery_id) VALUES (?, ?)", [(row[1], row[0]) for row in rows])
+
+    def _flush(self, table, chunk, result):
+        """Write a chunk of (line number, row dict, values) in one transaction."""
+        if not chunk:
+            return
+        try:
+            with self.db.transaction() as cursor:
+                inserted = self._with_ids(cursor, table, [values for line_number, row, values in chunk])
+                self._write(cursor, table, inserted)
+        except sqlite3.Error:
+            # Find the offending rows by writing the chunk one row at a time
+            inserted = []
+            for line_number, row, values in chunk:
+                try:
+                    with self.db.transaction() as cursor:
+                        values = self._with_ids(cursor, table, [values])
+                        self._write(cursor, table, values)
+                    inserted.extend(values)
+                except sqlite3.Error as error:
+                    result.rejected.append((line_number, str(error), row))
+        if table == "task":
+            for values in inserted:
+                self._names("task")[values[2]] = values[0]
+        result.inserted += len(inserted)
+
+    def import_rows(self, table, rows, on_progress=None):
+        """Import (line number, row dict) pairs into table and return an ImportResult.
+
+        on_progress(result) is called after each chunk.
+        """
+        if table not in IMPORT_COLUMNS:
+            raise ValueError(f"Cannot import into {table}")
+        result = ImportResult(table)
+        started = time.perf_counter()
+        chunk = []
+        pending_names, pending_ids = set(), set()
+        for line_number, row in rows:
+            result.read += 1
+            if isinstance(row, Exception):
+                result.rejected.append((line_number, str(row), None))
+                continue
+            unknown = [str(column) for column in row if column not in IMPORT_COLUMNS[table]]
+            if unknown:
+                result.rejected.append((line_number, f"unknown columns: {', '.join(unknown)}", row))
+                continue
+            try:
+                cleaned = self._clean(row)
+                if table == "task" and (cleaned.get("parent") in pending_names or cleaned.get("parent_id") in pending_ids):
+                    # The parent is waiting in this chunk, write it first so it has an id
+                    self._flush(table, chunk, result)
+                    chunk, pending_names, pending_ids = [], set(), set()
+                    if on_progress:
+                        on_progress(result)
+                values = self._prepare(table, cleaned)
+            except RejectedRow as error:
+                result.rejected.append((line_number, str(error), row))
+                continue
+            chunk.append((line_number, row, values))
+            if table == "task":
+                pending_names.add(cleaned["name"])
+                if cleaned.get("id"):
+                    pending_ids.add(cleaned["id"])
+            if len(chunk) >= self.chunk_size:
+                self._flush(table, chunk, result)
+                chunk, pending_names, pending_ids = [], set(), set()
+                if on_progress:
+                    on_progress(result)
+        self._flush(table, chunk, result)
+        result.seconds = time.perf_counter() - started
+        if on_progress:
+            on_progress(result)
+        return result
+
+    def import_file(self, table, path, on_progress=None):
+        return self.import_rows(table, read_rows(path), on_progress)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import tasks, bookings or deliveries from CSV or JSONL files.")
+    parser.add_argument("table", choices=list(IMPORT_COLUMNS))
+    parser.add_argument("path", help="CSV file with a header line, or JSONL file (.jsonl)")
+    parser.add_argument("--db", help="database file, defaults to the one in config.conf")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="rows per transaction")
+    args = parser.parse_args()
+
+    db = Database(args.db or load_db_path())
+    try:
+        importer = Importer(db, args.chunk_size)
+        result = importer.import_file(args.table, args.path, on_progress=lambda r: print(f"\r{r.read} rows read", end="", flush=True))
+        print()
+        for line_number, reason, row in result.rejected:
+            print(f"line {line_number}: {reason}")
+        print(result.summary())
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
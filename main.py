@@ -1,20 +1,38 @@
-import sqlite3
+import time
+STARTED_AT = time.perf_counter()  # Startup timings are measured from here
+
 import tkinter as tk
-from tkinter import ttk, messagebox, font
-from tkcalendar import DateEntry
+from tkinter import ttk, messagebox, font, filedialog
 from datetime import datetime
-import webbrowser
 import os
-import tempfile
-import subprocess
-import time
-from MdToClipboard import MdToClipboard
+import logging
+from database import Database, load_db_path
+from autocomplete import Autocomplete
+from query_worker import QueryWorker
+from task_pager import TaskPager
+from timesheet import TimesheetEngine, TIMESHEET_GROUPS, TIMESHEET_HEADINGS, format_minutes
+
+# Report, clipboard, calendar, browser, editor, import and export modules
+# are imported where they are first used, so they do not delay the first paint.
 
 
 config_file_path = "./config.conf"
 
-with open(config_file_path, "r") as f:
-    db_path = f.readline().strip()
+log = logging.getLogger(__name__)
+
+SEARCH_ALL = "all"  # Search table entry for the full-text search over every table
+SEARCH_TABLES = ["task", "delivery", "link", "tag", "origin", "booking", "note"]
+SEARCH_OPERATORS = ["LIKE", "=", "!=", "<", ">", "<=", ">="]
+
+LAZY_PLACEHOLDER = ":placeholder"  # iid suffix of the dummy child of a not yet expanded task
+
+TASK_COLUMNS = ("customer", "name", "description", "started_at", "finished_at")
+
+PAGE_SIZE = 200         # Tasks fetched per page in the paged view
+PAGE_WINDOW = 3         # Pages kept in the tree at most, older ones are dropped
+PAGE_PRELOAD_AT = 0.9   # Scroll fraction past which the next page is fetched
+
+RELATED_PANES_DELAY_MS = 500  # Relation panes are built by then even if the task list was never exposed
 
 
 
@@ -22,6 +40,7 @@ with open(config_file_path, "r") as f:
 class CustomDateEntry(ttk.Frame):
     def __init__(self, master=None, **kw):
         super().__init__(master)
+        from tkcalendar import DateEntry
         self.date_entry = DateEntry(self, **kw)
         self.date_entry.pack(side=tk.LEFT)
 
@@ -42,7 +61,7 @@ class CustomDateEntry(ttk.Frame):
         if date_str and hour and minute:
             try:
                 date_ret = datetime.strptime(f"{date_str} {hour}:{minute}", "%Y-%m-%d %H:%M")
-                return date_ret.isoformat().replace(' ', 'T')
+                return date_ret.isoformat(timespec="seconds")
             except ValueError:
                 messagebox.showwarning("Warning", f"Invalid date or time format '%Y-%m-%d %H:%M': {date_str} {hour}:{minute}")
                 return None
@@ -50,12 +69,8 @@ class CustomDateEntry(ttk.Frame):
 
     def set_date(self, date_str=None):
         if date_str:
-            # Replace 'T' with a space to handle the ISO format
-            date_str = date_str.replace('T', ' ')
-            # Strip the seconds part if present
-            if ':' in date_str.split()[1]:
-                date_str = date_str.split(':')[0] + ":" + date_str.split(':')[1]
-            date_obj = datetime.strptime(date_str, "%Y-%m-%d %H:%M")
+            # Stored as ISO text, with or without seconds
+            date_obj = datetime.fromisoformat(date_str)
             self.date_entry.set_date(date_obj.date())
             self.hour_spinbox.delete(0, tk.END)
             self.hour_spinbox.insert(0, date_obj.strftime("%H"))
@@ -82,203 +97,19 @@ class CustomTreeview(ttk.Treeview):
         self.grid(column=0, row=row_offset, sticky="we")
         self.scrollbar.grid(column=1, row=row_offset, sticky="ns")
 
-class Database:
-    def __init__(self, db_path):
-        self.db_path = db_path
-        self.init_db()
-        self.connexion = self.Connexion(db_path)
-
-    # Database setup
-    def init_db(self):
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        cursor.executescript('''
-        CREATE TABLE IF NOT EXISTS task (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            customer TEXT,
-            name TEXT,
-            description TEXT,
-            started_at TEXT,
-            finished_at TEXT,
-            task_id INTEGER,
-            FOREIGN KEY(task_id) REFERENCES task(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS delivery (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            version TEXT,
-            server TEXT,
-            environment TEXT,
-            delivery_date_time TEXT
-        );
-
-        CREATE TABLE IF NOT EXISTS task_delivery (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            delivery_id INTEGER,
-            task_id INTEGER,
-            FOREIGN KEY(delivery_id) REFERENCES delivery(id),
-            FOREIGN KEY(task_id) REFERENCES task(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS link (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            type TEXT,
-            raw_link TEXT
-        );
-
-        CREATE TABLE IF NOT EXISTS task_link (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            task_id INTEGER,
-            link_id INTEGER,
-            FOREIGN KEY(task_id) REFERENCES task(id),
-            FOREIGN KEY(link_id) REFERENCES link(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS tag (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            type TEXT,
-            keywords TEXT
-        );
-
-        CREATE TABLE IF NOT EXISTS tag_task (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            task_id INTEGER,
-            tag_id INTEGER,
-            FOREIGN KEY(task_id) REFERENCES task(id),
-            FOREIGN KEY(tag_id) REFERENCES tag(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS tag_link (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            link_id INTEGER,
-            tag_id INTEGER,
-            FOREIGN KEY(link_id) REFERENCES link(id),
-            FOREIGN KEY(tag_id) REFERENCES tag(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS origin (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            type TEXT,
-            raw_link TEXT
-        );
-
-        CREATE TABLE IF NOT EXISTS task_origin (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            task_id INTEGER,
-            origin_id INTEGER,
-            FOREIGN KEY(task_id) REFERENCES task(id),
-            FOREIGN KEY(origin_id) REFERENCES origin(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS booking (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            description TEXT,
-            started_at TEXT,
-            ended_at TEXT,
-            duration TEXT,
-            task_id INTEGER,
-            origin_id INTEGER,
-            FOREIGN KEY(task_id) REFERENCES task(id),
-            FOREIGN KEY(origin_id) REFERENCES origin(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS note (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            task_id INTEGER,
-            content TEXT,
-            FOREIGN KEY(task_id) REFERENCES task(id)
-        );
-
-        CREATE TABLE IF NOT EXISTS settings (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            key TEXT UNIQUE,
-            value TEXT
-        );
-        ''')
-        conn.commit()
-        conn.close()
-
-    def execute_query(self, query, params=None):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            conn.commit()
-            return cursor
-
-    def fetch_all(self, query, params=None):
-        cursor = self.execute_query(query, params)
-        return cursor.fetchall()
-
-    def fetch_one(self, query, params=None):
-        cursor = self.execute_query(query, params)
-        return cursor.fetchone()
-
-    def save_theme(self, theme):
-        self.execute_query("INSERT OR REPLACE INTO settings (key, value) VALUES ('theme', ?)", (theme,))
-
-    def get_theme(self):
-        result = self.fetch_one("SELECT value FROM settings WHERE key = 'theme'")
-        return result[0] if result else None
-
-    def connect(self):
-        self.conn = sqlite3.connect(self.db_path)
-
-    def disconnect(self):
-        self.conn.close()
-
-    class Connexion:
-        def __init__(self, db_path):
-            self.db_path = db_path
-            self.conn = None
-            self._is_connected = False
-
-        def connect(self):
-            if self.is_connected():
-                raise RuntimeError("Trying to connect while already connected to {self.db_path}.")
-            self.conn = sqlite3.connect(self.db_path)
-            self._is_connected = True
-
-        def disconnect(self):
-            if not self.is_connected():
-                raise RuntimeError("Trying to disconnect while not connected to {self.db_path}.")
-            self.conn.close()
-            self._is_connected = False
-
-        def status(self):
-            return "connected" if self._is_connected else "disconnected"
-
-        def is_connected(self):
-            return self._is_connected
-
-        def fetch_all(self, query, params=None):
-            cursor = self._execute_query(query, params)
-            return cursor.fetchall()
-
-        def fetch_one(self, query, params=None):
-            cursor = self._execute_query(query, params)
-            return cursor.fetchone()
-
-        def _execute_query(self, query, params=None):
-            cursor = self.conn.cursor()
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            self.conn.commit()
-            return cursor
-
 # App class
 class TaskManagerApp:
-    def __init__(self, root):
+    def __init__(self, root, db_path):
         self.root = root
         self.root.title("Task Manager")
+        self.startup_timings = {}
+        self.related_panes_built = False
+        self.related_to_show = None  # Related data loaded before the panes were built
         self.db = Database(db_path)
+        self.autocomplete = Autocomplete(self.db)
         self.setup_ui()
+        self.worker = QueryWorker(self.root, on_busy_change=self.show_busy)
+        self.render_pool = None  # Report rendering processes, see get_render_pool
         self.load_tasks()
         self.temp_file_path = None  # To store the path of the temporary file
         self.selected_related_id = None
@@ -287,15 +118,44 @@ class TaskManagerApp:
         # Load the saved theme
         self.load_theme()
 
+        # The task list is painted first, the relation panes are built once it
+        # is on screen, or after a while if the window is never exposed
+        self.tree.bind("<Expose>", self.on_first_paint, add="+")
+        self.root.after(RELATED_PANES_DELAY_MS, self.build_related_panes)
+
+    def mark_startup(self, step):
+        """Record the time from launch to step, once."""
+        if step not in self.startup_timings:
+            self.startup_timings[step] = time.perf_counter() - STARTED_AT
+            if len(self.startup_timings) == 3:
+                log.info("Startup: %s", ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.startup_timings.items()))
+
+    def on_first_paint(self, event):
+        if "first paint" in self.startup_timings:
+            return
+        # Let Tk draw the exposed tree before timing it and building the rest
+        self.tree.update_idletasks()
+        self.mark_startup("first paint")
+        self.root.after(1, self.build_related_panes)
+
+    def build_related_panes(self):
+        if self.related_panes_built:
+            return
+        self.setup_related_panes()
+        self.related_panes_built = True
+        self.mark_startup("panes built")
+        if self.related_to_show is not None:
+            related, self.related_to_show = self.related_to_show, None
+            self.show_related_data(related)
+
     def load_theme(self):
-        result = self.db.fetch_one("SELECT value FROM settings WHERE key = 'theme'")
+        theme = self.db.get_theme()
 
-        if result:
-            theme = result[0]
-            self.change_theme(theme)
+        if theme:
+            self.change_theme(theme, save=False)
         else:
             # Default to normal theme if no saved theme is found
-            self.change_theme("normal")
+            self.change_theme("normal", save=False)
 
     def setup_ui(self):
 
@@ -315,6 +175,25 @@ class TaskManagerApp:
         theme_menu.add_command(label="Gray and Red Theme", command=lambda: self.change_theme("gray_red"))
         theme_menu.add_command(label="Orange and Blue Theme", command=lambda: self.change_theme("orange_blue"))
 
+        # Create a View menu
+        self.view_mode_var = tk.StringVar(value=self.db.get_setting("view_mode", "full"))
+        view_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="View", menu=view_menu)
+        view_menu.add_radiobutton(label="Full Tree", variable=self.view_mode_var, value="full", command=self.change_view_mode)
+        view_menu.add_radiobutton(label="Lazy Tree (load subtasks on expand)", variable=self.view_mode_var, value="lazy", command=self.change_view_mode)
+        view_menu.add_radiobutton(label="Paged List (large databases)", variable=self.view_mode_var, value="paged", command=self.change_view_mode)
+
+        # Create a Data menu
+        data_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="Data", menu=data_menu)
+        data_menu.add_command(label="Import Tasks...", command=lambda: self.import_data("task"))
+        data_menu.add_command(label="Import Bookings...", command=lambda: self.import_data("booking"))
+        data_menu.add_command(label="Import Deliveries...", command=lambda: self.import_data("delivery"))
+        data_menu.add_separator()
+        data_menu.add_command(label="Export All to JSONL...", command=lambda: self.export_data("jsonl"))
+        data_menu.add_command(label="Export All to CSV...", command=lambda: self.export_data("csv"))
+        data_menu.add_command(label="Export Selected Task Subtree...", command=lambda: self.export_data("jsonl", subtree=True))
+
         Treeview_height = 3
         row_offset = 0
         col_offset = 0
@@ -328,7 +207,7 @@ class TaskManagerApp:
         tk.Label(search_frame, text="Table:").grid(column=0, row=0)
         self.table_var = tk.StringVar()
         table_dropdown = ttk.Combobox(search_frame, textvariable=self.table_var)
-        table_dropdown['values'] = ["task", "delivery", "link", "tag", "origin", "booking", "note"]
+        table_dropdown['values'] = [SEARCH_ALL] + SEARCH_TABLES
         table_dropdown.grid(column=1, row=0)
         table_dropdown.bind("<<ComboboxSelected>>", self.update_field_dropdown)
         tk.Label(search_frame, text="Field:").grid(column=2, row=0)
@@ -338,7 +217,7 @@ class TaskManagerApp:
         tk.Label(search_frame, text="Operator:").grid(column=4, row=0)
         self.operator_var = tk.StringVar()
         operator_dropdown = ttk.Combobox(search_frame, textvariable=self.operator_var)
-        operator_dropdown['values'] = ["LIKE", "=", "!=", "<", ">", "<=", ">="]
+        operator_dropdown['values'] = SEARCH_OPERATORS
         operator_dropdown.grid(column=5, row=0)
         operator_dropdown.current(0)  # Set default operator to LIKE
         tk.Label(search_frame, text="Value:").grid(column=6, row=0)
@@ -346,20 +225,65 @@ class TaskManagerApp:
         self.value_entry.grid(column=7, row=0)
         tk.Button(search_frame, text="Search", command=self.search_data).grid(column=8, row=0)
 
+        # Busy indicator, shown while background queries are running
+        self.busy_indicator = ttk.Progressbar(search_frame, mode="indeterminate", length=80)
+        self.busy_indicator.grid(column=9, row=0, padx=5)
+        self.busy_indicator.grid_remove()
+
+        # Filters of the paged view, applied in SQL
+        self.page_filter_frame = tk.Frame(self.root)
+        self.page_filter_frame.grid(column=0, row=row_offset)
+        row_offset += 1
+        self.page_active_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.page_filter_frame, text="Active only", variable=self.page_active_var).grid(column=0, row=0)
+        tk.Label(self.page_filter_frame, text="Customer:").grid(column=1, row=0)
+        self.page_customer_var = tk.StringVar()
+        self.page_customer_combobox = ttk.Combobox(self.page_filter_frame, textvariable=self.page_customer_var)
+        self.page_customer_combobox.grid(column=2, row=0)
+        self.page_customer_combobox.bind("<KeyRelease>", self.update_page_customer_combobox)
+        tk.Label(self.page_filter_frame, text="Started from:").grid(column=3, row=0)
+        self.page_from_entry = tk.Entry(self.page_filter_frame, width=12)
+        self.page_from_entry.grid(column=4, row=0)
+        tk.Label(self.page_filter_frame, text="to:").grid(column=5, row=0)
+        self.page_to_entry = tk.Entry(self.page_filter_frame, width=12)
+        self.page_to_entry.grid(column=6, row=0)
+        tk.Button(self.page_filter_frame, text="Apply", command=self.apply_page_filters).grid(column=7, row=0)
+        self.page_status_var = tk.StringVar()
+        tk.Label(self.page_filter_frame, textvariable=self.page_status_var).grid(column=8, row=0, padx=5)
+        self.page_filter_frame.grid_remove()
+        self.pager = None
+        self.page_loading = False
+        self.page_more_before = False
+        self.page_more_after = False
+
         row_offset += 1
         col_offset = 0
 
         # Tasks
-        self.tree = ttk.Treeview(self.root, columns=("indicator", "customer", "name", "description", "started_at", "finished_at"), show="headings", height=Treeview_height)
+        self.tree = ttk.Treeview(self.root, columns=("indicator", *TASK_COLUMNS, "booked", "open_subtasks"), show="headings", height=Treeview_height)
         self.tree.heading("indicator", text=" ")
+        # Subtree totals, filled in by load_rollups() once the rows are shown
+        self.tree.heading("booked", text="booked")
+        self.tree.heading("open_subtasks", text="open subtasks")
+        self.tree.column("booked", width=70, anchor="e")
+        self.tree.column("open_subtasks", width=90, anchor="e")
+        self.tree.column("#0", width=40, stretch=False)
         self.tree.column("indicator", width=45)
-        for col in ("customer", "name", "description", "started_at", "finished_at"):
-            self.tree.heading(col, text=col, command=lambda _col=col: self.sort_treeview(_col, False))
+        for col in TASK_COLUMNS:
             self.tree.column(col, width=100)
+        # Sorting is done by the queries, the last sort is kept in the settings
+        self.sort_column = self.db.get_setting("task_sort_column")
+        if self.sort_column not in TASK_COLUMNS:
+            self.sort_column = None
+        self.sort_descending = self.db.get_setting("task_sort_descending") == "1"
+        self.update_sort_headings()
         self.tree.grid(column=0, row=row_offset)
         row_offset += 1
         self.tree.tag_configure("constant_width", font=self.constant_width_font)    # Configure the font for the Treeview
         self.tree.bind("<<TreeviewSelect>>", self.on_task_select)
+        self.tree.bind("<<TreeviewOpen>>", self.on_task_open)
+        self.tree.configure(yscrollcommand=self.on_tree_scroll)
+        self.lazy_reopen = set()
 
         btn_frame = tk.Frame(self.root)
         btn_frame.grid(column=0, row=row_offset)
@@ -371,6 +295,8 @@ class TaskManagerApp:
         row_offset += 1
         tk.Button(report_btn_frame, text="Generate Report", command=self.generate_report).grid(column=col_offset, row=0)
         col_offset += 1
+        tk.Button(report_btn_frame, text="Timesheet", command=self.open_timesheet).grid(column=col_offset, row=0)
+        col_offset += 1
 
         tk.Button(btn_frame, text="Add Task", command=lambda: self.task_form()).grid(column=col_offset, row=0)
         col_offset += 1
@@ -379,8 +305,12 @@ class TaskManagerApp:
         tk.Button(btn_frame, text="Edit Task", command=self.edit_task).grid(column=col_offset, row=0)
         col_offset += 1
         tk.Button(btn_frame, text="Delete Task", command=self.delete_task).grid(column=col_offset, row=0)
-        col_offset = 0
+        self.related_row_offset = row_offset
 
+    def setup_related_panes(self):
+        Treeview_height = 3
+        row_offset = self.related_row_offset
+        col_offset = 0
 
         tk.Label(self.root, text="Deliveries").grid(column=0, row=row_offset)
         row_offset += 1
@@ -505,7 +435,17 @@ class TaskManagerApp:
         tk.Button(note_btn_frame, text="Delete Note", command=self.delete_note).grid(column=col_offset, row=0)
         col_offset += 1
 
-    def change_theme(self, theme):
+    def show_busy(self, busy):
+        if busy:
+            self.busy_indicator.grid()
+            self.busy_indicator.start(10)
+            self.root.config(cursor="watch")
+        else:
+            self.busy_indicator.stop()
+            self.busy_indicator.grid_remove()
+            self.root.config(cursor="")
+
+    def change_theme(self, theme, save=True):
         if theme == "normal":
             self.root.config(bg="white")
             style = ttk.Style()
@@ -544,150 +484,194 @@ class TaskManagerApp:
             style.configure("Treeview", background="#ffcc99", foreground="#003366", fieldbackground="#ffcc99")
 
         # Save the selected theme to the database
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('theme', ?)", (theme,))
-        conn.commit()
-        conn.close()
+        if save:
+            self.db.save_theme(theme)
 
     def generate_report(self):
         selected_items = self.tree.selection()
-        selected_items = [int(item) for item in selected_items]
+        selected_items = [int(item) for item in selected_items if not item.endswith(LAZY_PLACEHOLDER)]
         if not selected_items:
             messagebox.showwarning("Warning", "Please select a task to generate a report")
             return
 
-        # Get the hierarchy of selected tasks
-        task_hierarchy = self.get_task_hierarchy(selected_items)
-
-        report_lines = []
-        visited_tasks = set()
-
-        def move_matching_row_to_end(array, col_nb = 2, pattern = "PROD"):
-            # Find rows where the second column is "PROD"
-            prod_rows = [row for row in array if row[col_nb] == pattern]
-
-            # Remove these rows from the original array
-            filtered_array = [row for row in array if row[col_nb] != pattern]
-
-            # Append the "PROD" rows to the end
-            result = filtered_array + prod_rows
-
-            return result
-
-
-        def sort_array_by_cols(list_of_lists, col_nbs, direction="asc"):
-            """
-            Sorts a list of lists by one or more column indices.
-
-            :param list_of_lists: List of rows (each a list).
-            :param col_nbs: A single column index (int) or list of column indices to sort by.
-            :param direction: 'asc' for ascending, 'desc' for descending.
-            :return: Sorted list of lists.
-            """
-            if isinstance(col_nbs, int):
-                col_nbs = [col_nbs]
-
-            reverse = direction.lower() == "desc"
-
-            return sorted(
-                list_of_lists,
-                key=lambda x: tuple(x[col] for col in col_nbs),
-                reverse=reverse
-            )
-
+        from report import ReportEngine
+        engine = ReportEngine(self.db)
+        pool = self.get_render_pool()
+
+        def run_report(show_progress):
+            from MdToClipboard import MdToClipboard
+            show_progress("Generating the report")
+            report_text = engine.generate(selected_items)
+            show_progress("Rendering the clipboard formats")
+            started = time.perf_counter()
+            rendered = MdToClipboard.render_html_for_onenote(report_text, pool, show_progress)
+            engine.timings["clipboard"] = time.perf_counter() - started
+            return rendered
+
+        self.run_with_progress("Report", run_report, lambda rendered: self.copy_report(engine, rendered), "Report failed")
+
+    def get_render_pool(self):
+        # Worker processes render the clipboard formats of reports side by side.
+        # One pool, started with the first report, serves every later report.
+        # They are spawned, not forked: forking this process copies Tk and the
+        # query worker threads' locks, which can hang the child.
+        if self.render_pool is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            self.render_pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn"))
+        return self.render_pool
+
+    def copy_report(self, engine, rendered):
+        # The clipboard is written from the Tk thread, which owns it on Windows
+        from MdToClipboard import MdToClipboard
+        MdToClipboard.copy_rendered(rendered)
+        messagebox.showinfo("Info", f"Report copied to {MdToClipboard.get_backend().description} ({engine.format_timings()})")
+
+    def import_data(self, table):
+        path = filedialog.askopenfilename(title=f"Import {table} rows", filetypes=[("CSV or JSONL files", "*.csv *.jsonl"), ("All files", "*.*")])
+        if not path:
+            return
 
-        def add_task_to_report(task_id, indent_level=0):
-            if task_id in visited_tasks:
+        def show_result(result):
+            self.autocomplete.invalidate(table)
+            self.load_tasks()
+            message = result.summary()
+            if result.rejected:
+                # The first few reasons are enough to fix the file
+                message += "\n\n" + "\n".join(f"line {line_number}: {reason}" for line_number, reason, row in result.rejected[:10])
+            messagebox.showinfo("Import", message)
+
+        def run_import(show_progress):
+            from importer import Importer
+            return Importer(self.db).import_file(table, path, on_progress=lambda result: show_progress(f"{result.read} rows read, {result.inserted} imported"))
+
+        self.run_with_progress(f"Importing {os.path.basename(path)}", run_import, show_result, "Import failed")
+
+    def export_data(self, fmt, subtree=False):
+        task_id = None
+        if subtree:
+            selected_items = [item for item in self.tree.selection() if not item.endswith(LAZY_PLACEHOLDER)]
+            if not selected_items:
+                messagebox.showwarning("Warning", "Please select a task to export")
                 return
-            visited_tasks.add(task_id)
-
-            self.db.connexion.connect()
-
-            # Get task details
-            task = self.db.connexion.fetch_one("SELECT id, customer, name, description, started_at, finished_at FROM task WHERE id = ?", (task_id,))
-
-            if task:
-                one = 1
-                indent = "    " * indent_level
-                sub_indent = "    " * one
-                if task[1] != "":
-                    report_lines.append(f"{indent}<p><strong>{task[1]}</strong>: <code>{task[2]}</code><p><ul>")
-                    # report_lines.append(f"{indent}<p>{task[1]}</p><ul>")
-                    report_lines.append(f"{indent}{sub_indent}<li>Description: {task[3]}</li>")
-                else:
-                    report_lines.append(f"{indent}<li>Sub-task: <code>{task[2]}</code></li><ul>")
-                    report_lines.append(f"{indent}{sub_indent}<li>Description: {task[3]}</li>")
-
-                # Get related deliveries
-                deliveries = self.db.connexion.fetch_all("SELECT d.version, d.server, d.environment, d.delivery_date_time FROM delivery d JOIN task_delivery td ON d.id = td.delivery_id WHERE td.task_id = ?", (task_id,))
-                if deliveries:
-                    report_lines.append(f"{indent}{sub_indent}<li>Deliveries:</li><ul>")
-
-                    # Order deliveries
-                    deliveries = sort_array_by_cols(deliveries, [0, 2])
-                    deliveries = move_matching_row_to_end(deliveries, 2, "PROD")
-
-                    last_version_and_server = None
-                    delivery_date = ""
-                    close_list_tag = ""
-                    for delivery in deliveries:
-                        version_and_server = f"V {delivery[0]}, {delivery[1]}"
-                        if version_and_server != last_version_and_server :
-                            report_lines.append(f"{close_list_tag}{indent}{sub_indent}{sub_indent}<li>{version_and_server}:</li><ul>") # new version or server
-                            close_list_tag = "</ul>"
-                        delivery_date = delivery[3][:-3].replace("T", " ").replace("-", ".").replace(":", "h")
-                        report_lines.append(f"{indent}{sub_indent}{sub_indent}{sub_indent}<li>[x] {delivery[2]}, {delivery_date}")
-                        last_version_and_server = version_and_server
-
-                    report_lines.append("</ul></ul>")
-
-                # Get related origins
-                origins = self.db.connexion.fetch_all("SELECT o.name, o.type, o.raw_link FROM origin o JOIN task_origin t_o ON o.id = t_o.origin_id WHERE t_o.task_id = ?", (task_id,))
-                if origins:
-                    for origin in origins:
-                        report_lines.append(f"{indent}{sub_indent}<li><a href=\"{origin[2]}\">BCS: {origin[0]}</a></li>")
-
-            self.db.connexion.disconnect()
-
-            # Recursively add child tasks
-            if task_id in task_hierarchy:
-                for child_id in task_hierarchy[task_id]:
-                    add_task_to_report(child_id, indent_level + 1)
-
-        # Generate the report with hierarchy
-        for task_id in selected_items:
-            add_task_to_report(task_id)
-            report_lines.append("</ul>")
-
-        report_text = "\n".join(report_lines)
-
-        MdToClipboard.html_to_clipboard_for_onenote(report_text)
-        messagebox.showinfo("Info", "Report copied to clipboard")
-
-    def get_task_hierarchy(self, task_ids):
-        self.db.connexion.connect()
-        task_hierarchy = {task_id: [] for task_id in task_ids}
-        subtasks = []
-        for task_id in task_ids:
-            children = self.db.connexion.fetch_all("SELECT id FROM task WHERE task_id = ?", (task_id,))
-            filtered_children = [child[0] for child in children if child[0] in task_ids]
-            if len(filtered_children) > 0:
-                for filtered_child in filtered_children:
-                    subtasks.append(filtered_child)
-            if task_id in subtasks:
-                del task_hierarchy[task_id]
-            else:
-                task_hierarchy[task_id].extend(filtered_children)
-
-        self.db.connexion.disconnect()
-        return task_hierarchy
+            task_id = int(selected_items[0])
+        directory = filedialog.askdirectory(title="Export to folder")
+        if not directory:
+            return
 
+        def run_export(show_progress):
+            from exporter import Exporter
+            return Exporter(self.db).export(directory, fmt, task_id=task_id, on_progress=lambda table, done, total: show_progress(f"{table}: {done}/{total} rows"))
+
+        def show_result(counts):
+            messagebox.showinfo("Export", f"{sum(counts.values())} rows from {len(counts)} tables exported to {directory}")
+
+        self.run_with_progress("Exporting", run_export, show_result, "Export failed")
+
+    def run_with_progress(self, title, job, on_done, error_message):
+        """Run job(show_progress) on the query worker behind a small progress window.
+
+        show_progress(text) may be called from the worker thread; the window
+        shows the latest text until the job finishes, then on_done(result) runs.
+        """
+        window = tk.Toplevel(self.root)
+        window.title(title)
+        progress_var = tk.StringVar(value="Starting...")
+        tk.Label(window, textvariable=progress_var, width=50).pack(padx=10, pady=5)
+        progress_bar = ttk.Progressbar(window, mode="indeterminate", length=300)
+        progress_bar.pack(padx=10, pady=5)
+        progress_bar.start()
+        latest = {}
+
+        def poll():
+            if window.winfo_exists():
+                if "text" in latest:
+                    progress_var.set(latest["text"])
+                window.after(100, poll)
+
+        def done(result):
+            window.destroy()
+            on_done(result)
+
+        def failed(error):
+            window.destroy()
+            messagebox.showerror("Error", f"{error_message}: {error}")
+
+        poll()
+        self.worker.submit(lambda: job(lambda text: latest.__setitem__("text", text)), done, on_error=failed)
+
+    def open_timesheet(self):
+        engine = TimesheetEngine(self.db)
+        window = tk.Toplevel(self.root)
+        window.title("Timesheet")
+
+        filter_frame = tk.Frame(window)
+        filter_frame.grid(column=0, row=0)
+        tk.Label(filter_frame, text="Group by:").grid(column=0, row=0)
+        group_var = tk.StringVar(value="week")
+        group_dropdown = ttk.Combobox(filter_frame, textvariable=group_var, state="readonly", width=10)
+        group_dropdown['values'] = list(TIMESHEET_GROUPS)
+        group_dropdown.grid(column=1, row=0)
+        tk.Label(filter_frame, text="From:").grid(column=2, row=0)
+        from_entry = tk.Entry(filter_frame, width=12)
+        from_entry.grid(column=3, row=0)
+        tk.Label(filter_frame, text="To:").grid(column=4, row=0)
+        to_entry = tk.Entry(filter_frame, width=12)
+        to_entry.grid(column=5, row=0)
+
+        tree = CustomTreeview(window, columns=TIMESHEET_HEADINGS, show="headings", height=15, row_offset=1)
+        for col in TIMESHEET_HEADINGS:
+            tree.heading(col, text=col)
+            tree.column(col, width=110)
+        total_var = tk.StringVar()
+        tk.Label(window, textvariable=total_var).grid(column=0, row=2)
+
+        def read_filters():
+            dates = []
+            for entry in (from_entry, to_entry):
+                date_str = entry.get().strip()
+                if date_str:
+                    try:
+                        datetime.strptime(date_str, "%Y-%m-%d")
+                    except ValueError:
+                        messagebox.showwarning("Warning", f"Invalid date format '%Y-%m-%d': {date_str}", parent=window)
+                        return None
+                dates.append(date_str or None)
+            return (group_var.get(), *dates)
+
+        def show_totals(rows):
+            if not tree.winfo_exists():
+                return
+            tree.delete(*tree.get_children())
+            for grouping, minutes, bookings, running, share in rows:
+                tree.insert("", "end", values=(grouping, format_minutes(minutes), bookings, format_minutes(running), share))
+            total_var.set(f"Total: {format_minutes(rows[-1][3]) if rows else '0:00'}")
+
+        def refresh(event=None):
+            filters = read_filters()
+            if filters:
+                self.worker.submit(lambda: engine.totals(*filters), show_totals, key="timesheet")
+
+        def export():
+            filters = read_filters()
+            if not filters:
+                return
+            path = filedialog.asksaveasfilename(parent=window, defaultextension=".csv", filetypes=[("CSV files", "*.csv")], initialfile=f"timesheet_{filters[0]}.csv")
+            if path:
+                self.worker.submit(lambda: engine.export_csv(path, *filters), lambda count: messagebox.showinfo("Info", f"{count} rows exported to {path}", parent=window), key="timesheet_export", on_error=lambda error: messagebox.showerror("Error", f"Export failed: {error}", parent=window))
 
+        group_dropdown.bind("<<ComboboxSelected>>", refresh)
+        tk.Button(filter_frame, text="Refresh", command=refresh).grid(column=6, row=0)
+        tk.Button(filter_frame, text="Export CSV", command=export).grid(column=7, row=0)
+        refresh()
 
     def update_field_dropdown(self, event):
         table = self.table_var.get()
-        if table:
+        if table == SEARCH_ALL:
+            # The full-text search looks at every field
+            self.field_dropdown['values'] = []
+            self.field_var.set("")
+        elif table in SEARCH_TABLES:
             fields = self.db.fetch_all(f"PRAGMA table_info({table})")
             field_names = [field[1] for field in fields]
             self.field_dropdown['values'] = field_names
@@ -695,63 +679,275 @@ class TaskManagerApp:
                 self.field_var.set(field_names[0])
 
 
+    def change_view_mode(self):
+        self.db.set_setting("view_mode", self.view_mode_var.get())
+        self.pager = None
+        self.load_tasks()
+
     def load_tasks(self):
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        if self.view_mode_var.get() == "paged":
+            self.page_filter_frame.grid()
+        else:
+            self.page_filter_frame.grid_remove()
+
+        if self.view_mode_var.get() == "paged":
+            self.load_task_page()
+        elif self.view_mode_var.get() == "lazy":
+            # Only the roots are loaded now, subtasks follow when a branch is opened.
+            # Remember the open branches so a refresh opens them again.
+            self.tree.configure(show="tree headings")
+            self.lazy_reopen = {iid for iid in self.iter_tree_items() if self.tree.item(iid, "open")}
+            self.worker.submit(lambda: self.db.fetch_task_children(None, self.sort_column, self.sort_descending), self.show_lazy_roots, key="tasks")
+        else:
+            # The whole hierarchy comes back in one query, parents before children
+            self.tree.configure(show="headings")
+            self.worker.submit(lambda: self.db.fetch_task_tree(self.sort_column, self.sort_descending), self.show_tasks, key="tasks")
+
+    def load_task_page(self):
+        # Only a window of rows is in the tree. A refresh reloads the window
+        # from its first row; new filters start again from the top.
+        self.tree.configure(show="headings")
+        items = self.tree.get_children()
+        if self.pager is None or not items:
+            pager = self.make_pager()
+            if pager is None:
+                return
+            fetch_page, more_before = pager.first_page, False
+        else:
+            pager = self.pager
+            first_id = int(items[0])
+
+            def fetch_page():
+                # Start over if the first row is gone
+                tasks, has_more = pager.page_from(first_id)
+                return (tasks, has_more) if tasks else pager.first_page()
+
+            more_before = True
+        self.pager = pager
+        self.worker.cancel("page")
+        self.worker.submit(lambda: (pager.count(), fetch_page()), lambda result: self.show_task_window(pager, result[1], more_before, result[0]), key="tasks", on_error=self.page_failed)
+
+    def make_pager(self):
+        dates = []
+        for entry in (self.page_from_entry, self.page_to_entry):
+            date_str = entry.get().strip()
+            if date_str:
+                try:
+                    datetime.strptime(date_str, "%Y-%m-%d")
+                except ValueError:
+                    messagebox.showwarning("Warning", f"Invalid date format '%Y-%m-%d': {date_str}")
+                    return None
+            dates.append(date_str or None)
+        return TaskPager(self.db, PAGE_SIZE, active_only=self.page_active_var.get(), customer=self.page_customer_var.get().strip() or None, started_from=dates[0], started_to=dates[1], sort_column=self.sort_column, descending=self.sort_descending)
+
+    def apply_page_filters(self):
+        self.pager = None
+        self.load_tasks()
 
-        # Load parent tasks
-        parent_tasks = self.db.fetch_all("SELECT id, customer, name, description, started_at, finished_at, task_id FROM task WHERE task_id IS NULL")
+    def update_page_customer_combobox(self, event=None):
+        self.page_customer_combobox['values'] = self.autocomplete.suggest("task", "customer", self.page_customer_var.get())
 
+    def show_task_window(self, pager, page, more_before, total=None):
+        if pager is not self.pager:
+            return
+        tasks, has_more = page
+        self.tree.delete(*self.tree.get_children())
+        # Unless the window starts at the top, assume there may be rows above it
+        self.page_more_before = more_before
+        self.page_more_after = has_more
+        self.insert_page_tasks(tasks, "end")
+        self.load_rollups([task[0] for task in tasks], key="rollups")
+        if total is not None:
+            self.page_status_var.set(f"{total} tasks")
+        self.page_loading = False
+        self.mark_startup("tasks shown")
+
+    def insert_page_tasks(self, tasks, index):
+        # Prepended rows go in one by one at index 0, so insert them last first
+        for task in (tasks if index == "end" else reversed(tasks)):
+            indicator = "─────" if task[6] is None else "  └──"
+            self.tree.insert("", index, iid=task[0], values=(indicator, task[1], task[2], task[3], task[4], task[5]), tags=("constant_width",))
+
+    def on_tree_scroll(self, first, last):
+        if self.view_mode_var.get() != "paged" or self.page_loading or self.pager is None:
+            return
+        items = self.tree.get_children()
+        if not items:
+            return
+        pager = self.pager
+        if float(last) >= PAGE_PRELOAD_AT and self.page_more_after:
+            last_id = int(items[-1])
+            self.page_loading = True
+            self.worker.submit(lambda: pager.page_after(last_id), lambda page: self.show_task_page(pager, page, after=True), key="page", on_error=self.page_failed)
+        elif float(first) <= 1 - PAGE_PRELOAD_AT and self.page_more_before:
+            first_id = int(items[0])
+            self.page_loading = True
+            self.worker.submit(lambda: pager.page_before(first_id), lambda page: self.show_task_page(pager, page, after=False), key="page", on_error=self.page_failed)
+
+    def page_failed(self, error):
+        # Let the next scroll try again
+        self.page_loading = False
+        self.page_status_var.set(f"Loading failed: {error}")
+
+    def show_task_page(self, pager, page, after):
+        if pager is not self.pager:
+            return
+        tasks, has_more = page
+        items = self.tree.get_children()
+        excess = len(items) + len(tasks) - PAGE_SIZE * PAGE_WINDOW
+        if after:
+            self.page_more_after = has_more
+            self.insert_page_tasks(tasks, "end")
+            if excess > 0:
+                # Drop the rows scrolled far above; the view keeps its row index, so move it back
+                self.tree.delete(*items[:excess])
+                self.tree.yview_scroll(-excess, "units")
+                self.page_more_before = True
+        else:
+            self.page_more_before = has_more
+            self.insert_page_tasks(tasks, 0)
+            self.tree.yview_scroll(len(tasks), "units")
+            if excess > 0:
+                self.tree.delete(*items[-excess:])
+                self.page_more_after = True
+        self.load_rollups([task[0] for task in tasks])
+        self.page_loading = False
+
+    def load_rollups(self, task_ids, key=None):
+        if task_ids:
+            self.worker.submit(lambda: self.db.fetch_task_rollups(task_ids), self.show_rollups, key=key)
+
+    def refresh_rollups(self):
+        # After bookings change, every shown total may be affected
+        self.load_rollups([int(iid) for iid in self.iter_tree_items() if not iid.endswith(LAZY_PLACEHOLDER)], key="rollups")
+
+    def show_rollups(self, rollups):
+        for task_id, (booked_minutes, open_subtasks) in rollups.items():
+            task_iid = str(task_id)
+            if self.tree.exists(task_iid):
+                self.tree.set(task_iid, "booked", format_minutes(booked_minutes))
+                self.tree.set(task_iid, "open_subtasks", open_subtasks or "")
+
+    def iter_tree_items(self, parent=""):
+        for iid in self.tree.get_children(parent):
+            yield iid
+            yield from self.iter_tree_items(iid)
+
+    def show_lazy_roots(self, tasks):
         self.tree.delete(*self.tree.get_children())
+        self.insert_lazy_tasks("", tasks)
+        self.load_rollups([task[0] for task in tasks], key="rollups")
+        self.mark_startup("tasks shown")
 
-        # Insert parent tasks into the tree
-        for task in parent_tasks:
-            self.tree.insert("", "end", iid=task[0], values=("─────", task[1], task[2], task[3], task[4], task[5]), tags=("constant_width",))
-            self.load_children_tasks(task[0], "")
+    def insert_lazy_tasks(self, parent_iid, tasks):
+        indicator = "─────" if parent_iid == "" else "  └──"
+        for task in tasks:
+            task_iid = self.tree.insert(parent_iid, "end", iid=task[0], values=(indicator, task[1], task[2], task[3], task[4], task[5]), tags=("constant_width",))
+            if task[7] > 0:
+                # The cached child count decides whether the node gets an expand arrow
+                self.tree.insert(task_iid, "end", iid=f"{task_iid}{LAZY_PLACEHOLDER}")
+                if task_iid in self.lazy_reopen:
+                    self.tree.item(task_iid, open=True)
+                    self.load_task_children(task_iid)
+
+    def on_task_open(self, event):
+        self.load_task_children(self.tree.focus())
+
+    def load_task_children(self, task_iid):
+        if self.tree.exists(f"{task_iid}{LAZY_PLACEHOLDER}"):
+            self.worker.submit(lambda: self.db.fetch_task_children(int(task_iid), self.sort_column, self.sort_descending), lambda tasks: self.show_task_children(task_iid, tasks), key=("children", task_iid))
+
+    def show_task_children(self, task_iid, tasks):
+        placeholder = f"{task_iid}{LAZY_PLACEHOLDER}"
+        if not self.tree.exists(placeholder):
+            return
+        self.tree.delete(placeholder)
+        self.insert_lazy_tasks(task_iid, tasks)
+        self.load_rollups([task[0] for task in tasks])
+
+    def reveal_task(self, task_id, on_revealed):
+        """Make sure task_id is in the tree, loading its branch if needed, then call on_revealed."""
+        task_iid = str(task_id)
+        if self.tree.exists(task_iid):
+            on_revealed()
+            return
 
+        if self.view_mode_var.get() == "paged":
+            # Move the window so it starts at the task
+            pager = self.pager
+            if pager is None:
+                return
 
-    def load_children_tasks(self, parent_id, parent_iid):
-        # Load children tasks for the given parent_id
-        children_tasks = self.db.fetch_all("SELECT id, customer, name, description, started_at, finished_at, task_id FROM task WHERE task_id = ?", (parent_id,))
+            def show_window(page):
+                self.show_task_window(pager, page, True)
+                if self.tree.exists(task_iid):
+                    on_revealed()
 
-        for task in children_tasks:
-            indicator = "  └──"
-            task_iid = self.tree.insert(parent_iid, "end", iid=task[0], values=(indicator, task[1], task[2], task[3], task[4], task[5]), tags=("constant_width",))
-            self.load_children_tasks(task[0], task_iid)
+            self.worker.submit(lambda: pager.page_from(int(task_id)), show_window, key="tasks")
+            return
+
+        def fetch_branch():
+            return [(str(ancestor), self.db.fetch_task_children(ancestor, self.sort_column, self.sort_descending)) for ancestor in self.db.fetch_task_ancestors(int(task_id))]
 
+        def show_branch(branch):
+            for ancestor_iid, children in branch:
+                if not self.tree.exists(ancestor_iid):
+                    return
+                self.show_task_children(ancestor_iid, children)
+                self.tree.item(ancestor_iid, open=True)
+            if self.tree.exists(task_iid):
+                on_revealed()
+
+        self.worker.submit(fetch_branch, show_branch, key="reveal")
+
+    def show_tasks(self, tasks):
+        self.tree.delete(*self.tree.get_children())
+
+        for task in tasks:
+            depth = task[7]
+            if depth == 0:
+                parent_iid, indicator = "", "─────"
+            else:
+                # Direct subtasks are listed under their root, deeper ones nest in their parent
+                parent_iid, indicator = ("" if depth == 1 else task[6]), "  └──"
+            self.tree.insert(parent_iid, "end", iid=task[0], values=(indicator, task[1], task[2], task[3], task[4], task[5]), tags=("constant_width",))
+        self.load_rollups([task[0] for task in tasks], key="rollups")
+        self.mark_startup("tasks shown")
 
     def on_task_select(self, event):
-        selected_items = self.tree.selection()
+        selected_items = [item for item in self.tree.selection() if not item.endswith(LAZY_PLACEHOLDER)]
         if selected_items:
             self.load_related_data(selected_items)
-            if self.related_to_select_next:
-                # Select the related data in the corresponding treeview
-                table, related_id = self.related_to_select_next
-                if table == "delivery":
-                    self.delivery_tree.selection_set(related_id)
-                    self.delivery_tree.focus(related_id)
-                    self.delivery_tree.see(related_id)
-                elif table == "link":
-                    self.link_tree.selection_set(related_id)
-                    self.link_tree.focus(related_id)
-                    self.link_tree.see(related_id)
-                elif table == "tag":
-                    self.tag_tree.selection_set(related_id)
-                    self.tag_tree.focus(related_id)
-                    self.tag_tree.see(related_id)
-                elif table == "origin":
-                    self.origin_tree.selection_set(related_id)
-                    self.origin_tree.focus(related_id)
-                    self.origin_tree.see(related_id)
-                elif table == "booking":
-                    self.booking_tree.selection_set(related_id)
-                    self.booking_tree.focus(related_id)
-                    self.booking_tree.see(related_id)
-                elif table == "note":
-                    self.note_tree.selection_set(related_id)
-                    self.note_tree.focus(related_id)
-                    self.note_tree.see(related_id)
-                self.related_to_select_next = None  # Reset after use
+
+    def select_related_next(self):
+        if self.related_to_select_next:
+            # Select the related data in the corresponding treeview
+            table, related_id = self.related_to_select_next
+            if table == "delivery":
+                self.delivery_tree.selection_set(related_id)
+                self.delivery_tree.focus(related_id)
+                self.delivery_tree.see(related_id)
+            elif table == "link":
+                self.link_tree.selection_set(related_id)
+                self.link_tree.focus(related_id)
+                self.link_tree.see(related_id)
+            elif table == "tag":
+                self.tag_tree.selection_set(related_id)
+                self.tag_tree.focus(related_id)
+                self.tag_tree.see(related_id)
+            elif table == "origin":
+                self.origin_tree.selection_set(related_id)
+                self.origin_tree.focus(related_id)
+                self.origin_tree.see(related_id)
+            elif table == "booking":
+                self.booking_tree.selection_set(related_id)
+                self.booking_tree.focus(related_id)
+                self.booking_tree.see(related_id)
+            elif table == "note":
+                self.note_tree.selection_set(related_id)
+                self.note_tree.focus(related_id)
+                self.note_tree.see(related_id)
+            self.related_to_select_next = None  # Reset after use
 
     def on_related_select(self, event, related_type):
         selected_item = event.widget.selection()
@@ -778,11 +974,12 @@ class TaskManagerApp:
             messagebox.showwarning("Warning", "Please select a task to delete")
             return
         task_id = selected_item[0]
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM task WHERE id = ?", (task_id,))
-        conn.commit()
-        conn.close()
+        subtask_count = len(self.db.fetch_task_descendants(task_id)) - 1
+        if subtask_count > 0 and not messagebox.askyesno("Delete Task", f"Also delete its {subtask_count} subtask(s)?"):
+            return
+        self.db.delete_task_tree(task_id)
+        self.autocomplete.invalidate("task")
+        self.autocomplete.invalidate("booking")
         self.load_tasks()
 
 
@@ -840,14 +1037,13 @@ class TaskManagerApp:
             desc = self.desc_var.get()
             started = started_entry.get_date()
             finished = finished_entry.get_date()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            if task:
-                cursor.execute("UPDATE task SET customer=?, name=?, description=?, started_at=?, finished_at=? WHERE id=?", (customer, name, desc, started, finished, task[0]))
-            else:
-                cursor.execute("INSERT INTO task (customer, name, description, started_at, finished_at, task_id) VALUES (?, ?, ?, ?, ?, ?)", (customer, name, desc, started, finished, parent_task_id))
-            conn.commit()
-            conn.close()
+            with self.db.transaction() as cursor:
+                if task:
+                    cursor.execute("UPDATE task SET customer=?, name=?, description=?, started_at=?, finished_at=? WHERE id=?", (customer, name, desc, started, finished, task[0]))
+                else:
+                    cursor.execute("INSERT INTO task (customer, name, description, started_at, finished_at, task_id) VALUES (?, ?, ?, ?, ?, ?)", (customer, name, desc, started, finished, parent_task_id))
+            previous = dict(customer=task[1], name=task[2], description=task[3]) if task else None
+            self.autocomplete.record("task", previous, customer=customer, name=name, description=desc)
             form.destroy()
             self.load_tasks()
 
@@ -859,87 +1055,53 @@ class TaskManagerApp:
         self.update_desc_combobox()
 
     def update_customer_combobox(self, event=None):
-        customer_input = self.customer_var.get()
-        customers = self.db.fetch_all("SELECT DISTINCT customer FROM task WHERE customer LIKE ?", ('%' + customer_input + '%',))
-
-        # Update the combobox values
-        self.customer_combobox['values'] = [customer[0] for customer in customers]
+        self.customer_combobox['values'] = self.autocomplete.suggest("task", "customer", self.customer_var.get())
 
     def update_name_combobox(self, event=None):
-        name_input = self.name_var.get()
-        names = self.db.fetch_all("SELECT DISTINCT name FROM task WHERE name LIKE ?", ('%' + name_input + '%',))
-
-        # Update the combobox values
-        self.name_combobox['values'] = [name[0] for name in names]
+        self.name_combobox['values'] = self.autocomplete.suggest("task", "name", self.name_var.get())
 
     def update_desc_combobox(self, event=None):
-        desc_input = self.desc_var.get()
-        descriptions = self.db.fetch_all("SELECT DISTINCT description FROM task WHERE description LIKE ?", ('%' + desc_input + '%',))
-
-
-        # Update the combobox values
-        self.desc_combobox['values'] = [desc[0] for desc in descriptions]
+        self.desc_combobox['values'] = self.autocomplete.suggest("task", "description", self.desc_var.get())
 
 
     def sort_treeview(self, col, descending):
-        data = [(self.tree.set(child, col), child) for child in self.tree.get_children("")]
-        data.sort(reverse=descending)
-        for index, (val, child) in enumerate(data):
-            self.tree.move(child, "", index)
-        self.tree.heading(col, command=lambda: self.sort_treeview(col, not descending))
+        self.sort_column = col
+        self.sort_descending = descending
+        self.db.set_setting("task_sort_column", col)
+        self.db.set_setting("task_sort_descending", "1" if descending else "0")
+        self.update_sort_headings()
+        self.pager = None
+        self.load_tasks()
+
+    def update_sort_headings(self):
+        # Clicking the sorted column again reverses it, any other column sorts ascending
+        for col in TASK_COLUMNS:
+            if col == self.sort_column:
+                text = f"{col} {'▼' if self.sort_descending else '▲'}"
+                descending = not self.sort_descending
+            else:
+                text, descending = col, False
+            self.tree.heading(col, text=text, command=lambda _col=col, _descending=descending: self.sort_treeview(_col, _descending))
 
     def load_related_data(self, task_ids):
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        deliveries = set()
-        links = set()
-        tags = set()
-        origins = set()
-        bookings = set()
-        notes = set()
-
-        for task_id in task_ids:
-            delivery_rel = self.db.fetch_all("""
-            SELECT d.id, d.version, d.server, d.environment, d.delivery_date_time
-            FROM delivery d
-            JOIN task_delivery td ON d.id = td.delivery_id
-            WHERE td.task_id = ?""", (task_id,))
-            deliveries.update(delivery_rel)
-
-            link_rel = self.db.fetch_all("""
-            SELECT l.id, l.type, l.raw_link
-            FROM link l
-            JOIN task_link tl ON l.id = tl.link_id
-            WHERE tl.task_id = ?""", (task_id,))
-            links.update(link_rel)
-
-            tag_rel = self.db.fetch_all("""
-            SELECT t.id, t.type, t.keywords
-            FROM tag t
-            JOIN tag_task tt ON t.id = tt.tag_id
-            WHERE tt.task_id = ?""", (task_id,))
-            tags.update(tag_rel)
-
-            origin_rel = self.db.fetch_all("""
-            SELECT o.id, o.name, o.type, o.raw_link
-            FROM origin o
-            JOIN task_origin t_o ON o.id = t_o.origin_id
-            WHERE t_o.task_id = ?""", (task_id,))
-            origins.update(origin_rel)
-
-            booking_rel = self.db.fetch_all("""
-            SELECT b.id, b.description, b.started_at, b.ended_at, b.duration
-            FROM booking b
-            WHERE b.task_id = ?""", (task_id,))
-            bookings.update(booking_rel)
-
-            note_rel = self.db.fetch_all("""
-            SELECT n.id, n.content
-            FROM note n
-            WHERE n.task_id = ?""", (task_id,))
-            notes.update(note_rel)
+        if isinstance(task_ids, (str, int)):
+            task_ids = [task_ids]
 
+        task_ids = list(task_ids)
+        # Superseded by the next selection change if the user moves on quickly
+        self.worker.submit(lambda: self.db.fetch_related(task_ids), self.show_related_data, key="related")
+
+    def show_related_data(self, related):
+        if not self.related_panes_built:
+            # Shown by build_related_panes
+            self.related_to_show = related
+            return
+        deliveries = related["delivery"]
+        links = related["link"]
+        tags = related["tag"]
+        origins = related["origin"]
+        bookings = related["booking"]
+        notes = related["note"]
 
         self.delivery_tree.delete(*self.delivery_tree.get_children())
         for delivery in deliveries:
@@ -972,6 +1134,8 @@ class TaskManagerApp:
                     note_title = note_lines[0]
                 self.note_tree.insert("", "end", iid=note[0], values=(note_title,))
 
+        self.select_related_next()
+
 
     def add_delivery(self):
         selected_item = self.tree.selection()
@@ -1008,13 +1172,11 @@ class TaskManagerApp:
             server = self.server_var.get()
             environment = self.environment_var.get()
             delivery_date_time = delivery_entry.get_date()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO delivery (version, server, environment, delivery_date_time) VALUES (?, ?, ?, ?)", (version, server, environment, delivery_date_time))
-            delivery_id = cursor.lastrowid
-            cursor.execute("INSERT INTO task_delivery (delivery_id, task_id) VALUES (?, ?)", (delivery_id, task_id))
-            conn.commit()
-            conn.close()
+            with self.db.transaction() as cursor:
+                cursor.execute("INSERT INTO delivery (version, server, environment, delivery_date_time) VALUES (?, ?, ?, ?)", (version, server, environment, delivery_date_time))
+                delivery_id = cursor.lastrowid
+                cursor.execute("INSERT INTO task_delivery (delivery_id, task_id) VALUES (?, ?)", (delivery_id, task_id))
+            self.autocomplete.record("delivery", version=version, server=server, environment=environment)
             form.destroy()
             self.load_related_data(task_id)
 
@@ -1026,19 +1188,13 @@ class TaskManagerApp:
         self.update_environment_combobox()
 
     def update_version_combobox(self, event=None):
-        version_input = self.version_var.get()
-        versions = self.db.fetch_all("SELECT DISTINCT version FROM delivery WHERE version LIKE ?", ('%' + version_input + '%',))
-        self.version_combobox['values'] = [version[0] for version in versions]
+        self.version_combobox['values'] = self.autocomplete.suggest("delivery", "version", self.version_var.get())
 
     def update_server_combobox(self, event=None):
-        server_input = self.server_var.get()
-        servers = self.db.fetch_all("SELECT DISTINCT server FROM delivery WHERE server LIKE ?", ('%' + server_input + '%',))
-        self.server_combobox['values'] = [server[0] for server in servers]
+        self.server_combobox['values'] = self.autocomplete.suggest("delivery", "server", self.server_var.get())
 
     def update_environment_combobox(self, event=None):
-        environment_input = self.environment_var.get()
-        environments = self.db.fetch_all("SELECT DISTINCT environment FROM delivery WHERE environment LIKE ?", ('%' + environment_input + '%',))
-        self.environment_combobox['values'] = [environment[0] for environment in environments]
+        self.environment_combobox['values'] = self.autocomplete.suggest("delivery", "environment", self.environment_var.get())
 
 
     def edit_delivery(self):
@@ -1081,11 +1237,8 @@ class TaskManagerApp:
                 server = self.server_var.get()
                 environment = self.environment_var.get()
                 delivery_date_time = delivery_entry.get_date()
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                cursor.execute("UPDATE delivery SET version=?, server=?, environment=?, delivery_date_time=? WHERE id=?", (version, server, environment, delivery_date_time, delivery_id))
-                conn.commit()
-                conn.close()
+                self.db.execute_query("UPDATE delivery SET version=?, server=?, environment=?, delivery_date_time=? WHERE id=?", (version, server, environment, delivery_date_time, delivery_id))
+                self.autocomplete.record("delivery", dict(version=delivery[1], server=delivery[2], environment=delivery[3]), version=version, server=server, environment=environment)
                 form.destroy()
                 self.load_related_data(self.tree.selection()[0])
 
@@ -1101,11 +1254,8 @@ class TaskManagerApp:
             messagebox.showwarning("Warning", "Please select a delivery to delete")
             return
         delivery_id = self.selected_related_id
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM delivery WHERE id = ?", (delivery_id,))
-        conn.commit()
-        conn.close()
+        self.db.execute_query("DELETE FROM delivery WHERE id = ?", (delivery_id,))
+        self.autocomplete.invalidate("delivery")
         self.load_related_data(self.tree.selection()[0])
 
     def add_link(self):
@@ -1129,13 +1279,11 @@ class TaskManagerApp:
         def save_link():
             link_type = self.link_type_var.get()
             raw_link = link_entry.get()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO link (type, raw_link) VALUES (?, ?)", (link_type, raw_link))
-            link_id = cursor.lastrowid
-            cursor.execute("INSERT INTO task_link (link_id, task_id) VALUES (?, ?)", (link_id, task_id))
-            conn.commit()
-            conn.close()
+            with self.db.transaction() as cursor:
+                cursor.execute("INSERT INTO link (type, raw_link) VALUES (?, ?)", (link_type, raw_link))
+                link_id = cursor.lastrowid
+                cursor.execute("INSERT INTO task_link (link_id, task_id) VALUES (?, ?)", (link_id, task_id))
+            self.autocomplete.record("link", type=link_type)
             form.destroy()
             self.load_related_data(task_id)
 
@@ -1145,9 +1293,7 @@ class TaskManagerApp:
         self.update_link_type_combobox()
 
     def update_link_type_combobox(self, event=None):
-        link_type_input = self.link_type_var.get()
-        link_types = self.db.fetch_all("SELECT DISTINCT type FROM link WHERE type LIKE ?", ('%' + link_type_input + '%',))
-        self.link_type_combobox['values'] = [link_type[0] for link_type in link_types]
+        self.link_type_combobox['values'] = self.autocomplete.suggest("link", "type", self.link_type_var.get())
 
 
     def edit_link(self):
@@ -1173,11 +1319,8 @@ class TaskManagerApp:
             def save_link():
                 link_type = self.link_type_var.get()
                 raw_link = link_entry.get()
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                cursor.execute("UPDATE link SET type=?, raw_link=? WHERE id=?", (link_type, raw_link, link_id))
-                conn.commit()
-                conn.close()
+                self.db.execute_query("UPDATE link SET type=?, raw_link=? WHERE id=?", (link_type, raw_link, link_id))
+                self.autocomplete.record("link", dict(type=link[1]), type=link_type)
                 form.destroy()
                 self.load_related_data(self.tree.selection()[0])
 
@@ -1192,11 +1335,8 @@ class TaskManagerApp:
             messagebox.showwarning("Warning", "Please select a link to delete")
             return
         link_id = self.selected_related_id
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM link WHERE id = ?", (link_id,))
-        conn.commit()
-        conn.close()
+        self.db.execute_query("DELETE FROM link WHERE id = ?", (link_id,))
+        self.autocomplete.invalidate("link")
         self.load_related_data(self.tree.selection()[0])
 
     def add_tag(self):
@@ -1222,13 +1362,11 @@ class TaskManagerApp:
         def save_tag():
             tag_type = self.tag_type_var.get()
             keywords = self.keywords_var.get()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO tag (type, keywords) VALUES (?, ?)", (tag_type, keywords))
-            tag_id = cursor.lastrowid
-            cursor.execute("INSERT INTO tag_task (tag_id, task_id) VALUES (?, ?)", (tag_id, task_id))
-            conn.commit()
-            conn.close()
+            with self.db.transaction() as cursor:
+                cursor.execute("INSERT INTO tag (type, keywords) VALUES (?, ?)", (tag_type, keywords))
+                tag_id = cursor.lastrowid
+                cursor.execute("INSERT INTO tag_task (tag_id, task_id) VALUES (?, ?)", (tag_id, task_id))
+            self.autocomplete.record("tag", type=tag_type, keywords=keywords)
             form.destroy()
             self.load_related_data(task_id)
 
@@ -1239,14 +1377,10 @@ class TaskManagerApp:
         self.update_keywords_combobox()
 
     def update_tag_type_combobox(self, event=None):
-        tag_type_input = self.tag_type_var.get()
-        tag_types = self.db.fetch_all("SELECT DISTINCT type FROM tag WHERE type LIKE ?", ('%' + tag_type_input + '%',))
-        self.tag_type_combobox['values'] = [tag_type[0] for tag_type in tag_types]
+        self.tag_type_combobox['values'] = self.autocomplete.suggest("tag", "type", self.tag_type_var.get())
 
     def update_keywords_combobox(self, event=None):
-        keywords_input = self.keywords_var.get()
-        keywords = self.db.fetch_all("SELECT DISTINCT keywords FROM tag WHERE keywords LIKE ?", ('%' + keywords_input + '%',))
-        self.keywords_combobox['values'] = [keyword[0] for keyword in keywords]
+        self.keywords_combobox['values'] = self.autocomplete.suggest("tag", "keywords", self.keywords_var.get())
 
 
     def edit_tag(self):
@@ -1273,11 +1407,8 @@ class TaskManagerApp:
             def save_tag():
                 tag_type = self.tag_type_var.get()
                 keywords = self.keywords_var.get()
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                cursor.execute("UPDATE tag SET type=?, keywords=? WHERE id=?", (tag_type, keywords, tag_id))
-                conn.commit()
-                conn.close()
+                self.db.execute_query("UPDATE tag SET type=?, keywords=? WHERE id=?", (tag_type, keywords, tag_id))
+                self.autocomplete.record("tag", dict(type=tag[1], keywords=tag[2]), type=tag_type, keywords=keywords)
                 form.destroy()
                 self.load_related_data(self.tree.selection()[0])
 
@@ -1292,11 +1423,8 @@ class TaskManagerApp:
             messagebox.showwarning("Warning", "Please select a tag to delete")
             return
         tag_id = self.selected_related_id
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM tag WHERE id = ?", (tag_id,))
-        conn.commit()
-        conn.close()
+        self.db.execute_query("DELETE FROM tag WHERE id = ?", (tag_id,))
+        self.autocomplete.invalidate("tag")
         self.load_related_data(self.tree.selection()[0])
 
     def add_origin(self):
@@ -1327,13 +1455,11 @@ class TaskManagerApp:
             origin_name = self.origin_name_var.get()
             origin_type = self.origin_type_var.get()
             raw_link = link_entry.get()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO origin (name, type, raw_link) VALUES (?, ?, ?)", (origin_name, origin_type, raw_link))
-            origin_id = cursor.lastrowid
-            cursor.execute("INSERT INTO task_origin (origin_id, task_id) VALUES (?, ?)", (origin_id, task_id))
-            conn.commit()
-            conn.close()
+            with self.db.transaction() as cursor:
+                cursor.execute("INSERT INTO origin (name, type, raw_link) VALUES (?, ?, ?)", (origin_name, origin_type, raw_link))
+                origin_id = cursor.lastrowid
+                cursor.execute("INSERT INTO task_origin (origin_id, task_id) VALUES (?, ?)", (origin_id, task_id))
+            self.autocomplete.record("origin", name=origin_name, type=origin_type)
             form.destroy()
             self.load_related_data(task_id)
 
@@ -1344,14 +1470,10 @@ class TaskManagerApp:
         self.update_origin_type_combobox()
 
     def update_origin_name_combobox(self, event=None):
-        origin_name_input = self.origin_name_var.get()
-        origin_names = self.db.fetch_all("SELECT DISTINCT name FROM origin WHERE name LIKE ?", ('%' + origin_name_input + '%',))
-        self.origin_name_combobox['values'] = [origin_name[0] for origin_name in origin_names]
+        self.origin_name_combobox['values'] = self.autocomplete.suggest("origin", "name", self.origin_name_var.get())
 
     def update_origin_type_combobox(self, event=None):
-        origin_type_input = self.origin_type_var.get()
-        origin_types = self.db.fetch_all("SELECT DISTINCT type FROM origin WHERE type LIKE ?", ('%' + origin_type_input + '%',))
-        self.origin_type_combobox['values'] = [origin_type[0] for origin_type in origin_types]
+        self.origin_type_combobox['values'] = self.autocomplete.suggest("origin", "type", self.origin_type_var.get())
 
 
     def edit_origin(self):
@@ -1384,11 +1506,8 @@ class TaskManagerApp:
                 origin_name = self.origin_name_var.get()
                 origin_type = self.origin_type_var.get()
                 raw_link = link_entry.get()
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                cursor.execute("UPDATE origin SET name=?, type=?, raw_link=? WHERE id=?", (origin_name, origin_type, raw_link, origin_id))
-                conn.commit()
-                conn.close()
+                self.db.execute_query("UPDATE origin SET name=?, type=?, raw_link=? WHERE id=?", (origin_name, origin_type, raw_link, origin_id))
+                self.autocomplete.record("origin", dict(name=origin[1], type=origin[2]), name=origin_name, type=origin_type)
                 form.destroy()
                 self.load_related_data(self.tree.selection()[0])
 
@@ -1403,11 +1522,8 @@ class TaskManagerApp:
             messagebox.showwarning("Warning", "Please select an origin to delete")
             return
         origin_id = self.selected_related_id
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM origin WHERE id = ?", (origin_id,))
-        conn.commit()
-        conn.close()
+        self.db.execute_query("DELETE FROM origin WHERE id = ?", (origin_id,))
+        self.autocomplete.invalidate("origin")
         self.load_related_data(self.tree.selection()[0])
 
     def open_link(self, event):
@@ -1416,6 +1532,7 @@ class TaskManagerApp:
             link_id = selected_item[0]
             link = self.db.fetch_one("SELECT raw_link FROM link WHERE id = ?", (link_id,))
             if link:
+                import webbrowser
                 webbrowser.open_new_tab(link[0])
 
     def open_origin(self, event):
@@ -1424,6 +1541,7 @@ class TaskManagerApp:
             origin_id = selected_item[0]
             origin = self.db.fetch_one("SELECT raw_link FROM origin WHERE id = ?", (origin_id,))
             if origin:
+                import webbrowser
                 webbrowser.open_new_tab(origin[0])
 
     def add_booking(self):
@@ -1478,13 +1596,11 @@ class TaskManagerApp:
                 messagebox.showwarning("Warning", "Selected origin does not exist")
                 return
 
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO booking (description, started_at, ended_at, duration, task_id, origin_id) VALUES (?, ?, ?, ?, ?, ?)", (description, started_at, ended_at, duration, task_id, origin_id))
-            conn.commit()
-            conn.close()
+            self.db.execute_query("INSERT INTO booking (description, started_at, ended_at, duration, task_id, origin_id) VALUES (?, ?, ?, ?, ?, ?)", (description, started_at, ended_at, duration, task_id, origin_id))
+            self.autocomplete.record("booking", description=description)
             form.destroy()
             self.load_related_data(task_id)
+            self.refresh_rollups()
 
         tk.Button(form, text="Save", command=save_booking).grid(row=5, column=0, columnspan=2)
 
@@ -1492,9 +1608,7 @@ class TaskManagerApp:
         self.update_booking_desc_combobox()
 
     def update_booking_desc_combobox(self, event=None):
-        booking_desc_input = self.booking_desc_var.get()
-        booking_descs = self.db.fetch_all("SELECT DISTINCT description FROM booking WHERE description LIKE ?", ('%' + booking_desc_input + '%',))
-        self.booking_desc_combobox['values'] = [booking_desc[0] for booking_desc in booking_descs]
+        self.booking_desc_combobox['values'] = self.autocomplete.suggest("booking", "description", self.booking_desc_var.get())
 
 
     def edit_booking(self):
@@ -1558,13 +1672,11 @@ class TaskManagerApp:
                     messagebox.showwarning("Warning", "Selected origin does not exist")
                     return
 
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                cursor.execute("UPDATE booking SET description=?, started_at=?, ended_at=?, duration=?, origin_id=? WHERE id=?", (description, started_at, ended_at, duration, origin_id, booking_id))
-                conn.commit()
-                conn.close()
+                self.db.execute_query("UPDATE booking SET description=?, started_at=?, ended_at=?, duration=?, origin_id=? WHERE id=?", (description, started_at, ended_at, duration, origin_id, booking_id))
+                self.autocomplete.record("booking", dict(description=booking[1]), description=description)
                 form.destroy()
                 self.load_related_data(self.tree.selection()[0])
+                self.refresh_rollups()
 
             tk.Button(form, text="Save", command=save_booking).grid(row=5, column=0, columnspan=2)
 
@@ -1576,12 +1688,10 @@ class TaskManagerApp:
             messagebox.showwarning("Warning", "Please select a booking to delete")
             return
         booking_id = self.selected_related_id
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM booking WHERE id = ?", (booking_id,))
-        conn.commit()
-        conn.close()
+        self.db.execute_query("DELETE FROM booking WHERE id = ?", (booking_id,))
+        self.autocomplete.invalidate("booking")
         self.load_related_data(self.tree.selection()[0])
+        self.refresh_rollups()
 
     def add_note(self, task_id):
         self.add_note_button.config(relief=tk.RIDGE)
@@ -1604,6 +1714,8 @@ class TaskManagerApp:
         self.load_note_and_open_text_editor(notes_id)
 
     def load_note_and_open_text_editor(self, notes_id):
+        import tempfile
+        import subprocess
         # task_id = self.tree.selection()[0]
         note = None
 
@@ -1631,17 +1743,13 @@ class TaskManagerApp:
             with open(self.temp_file_path, "r") as file:
                 content = file.read()
 
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            if behavior == 'edit':
-                cursor.execute("SELECT id, content FROM note WHERE note.id = ?", (notes_id,))
-                note = cursor.fetchone()
-
-                cursor.execute("UPDATE note SET content = ? WHERE id = ?", (content, note[0]))
-            else:
-                cursor.execute("INSERT INTO note (task_id, content) VALUES (?, ?)", (task_id, content))
-            conn.commit()
-            conn.close()
+            with self.db.transaction() as cursor:
+                if behavior == 'edit':
+                    cursor.execute("SELECT id, content FROM note WHERE note.id = ?", (notes_id,))
+                    note = cursor.fetchone()
+                    cursor.execute("UPDATE note SET content = ? WHERE id = ?", (content, note[0]))
+                else:
+                    cursor.execute("INSERT INTO note (task_id, content) VALUES (?, ?)", (task_id, content))
 
             os.remove(self.temp_file_path)
             self.temp_file_path = None
@@ -1655,11 +1763,7 @@ class TaskManagerApp:
             messagebox.showwarning("Warning", "Please select a task to delete a note")
             return
         task_id = selected_items[0]
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM note WHERE task_id = ?", (task_id,))
-        conn.commit()
-        conn.close()
+        self.db.execute_query("DELETE FROM note WHERE task_id = ?", (task_id,))
         self.load_related_data([task_id])
 
     def is_file_open(self, file_path):
@@ -1679,25 +1783,40 @@ class TaskManagerApp:
         operator = self.operator_var.get()
         value = self.value_entry.get()
 
+        if table == SEARCH_ALL:
+            self.search_all(value)
+            return
+
         if not table or not field or not value:
             messagebox.showwarning("Warning", "Please enter all search criteria")
             return
 
+        # Table, field and operator end up in the SQL text, so only accept known ones
+        fields = [field_info[1] for field_info in self.db.fetch_all(f"PRAGMA table_info({table})")] if table in SEARCH_TABLES else []
+        if field not in fields or operator not in SEARCH_OPERATORS:
+            messagebox.showwarning("Warning", "Please choose a table, field and operator from the lists")
+            return
+
         if operator == "LIKE":
             query = f"SELECT * FROM {table} WHERE {field} LIKE ?"
             value = '%' + value + '%'
         else:
             query = f"SELECT * FROM {table} WHERE {field} {operator} ?"
 
-        cursor = self.db.execute_query(query, (value,))
-        results = cursor.fetchall()
+        def run_search():
+            with self.db.reader() as conn:
+                cursor = conn.execute(query, (value,))
+                return [desc[0] for desc in cursor.description], cursor.fetchall()
 
+        self.worker.submit(run_search, lambda result: self.show_search_results(table, *result), key="search")
+
+    def show_search_results(self, table, columns, results):
         if results:
             search_result_window = tk.Toplevel(self.root)
             search_result_window.title("Search Results")
-            result_tree = ttk.Treeview(search_result_window, columns=[desc[0] for desc in cursor.description], show="headings")
-            for col, desc in zip(result_tree["columns"], cursor.description):
-                result_tree.heading(col, text=desc[0])
+            result_tree = ttk.Treeview(search_result_window, columns=columns, show="headings")
+            for col in columns:
+                result_tree.heading(col, text=col)
                 result_tree.column(col, width=100)
             result_tree.pack(expand=True, fill=tk.BOTH)
 
@@ -1709,12 +1828,42 @@ class TaskManagerApp:
             messagebox.showinfo("Info", "No results found")
 
 
+    def search_all(self, value):
+        if not value.strip():
+            messagebox.showwarning("Warning", "Please enter a value to search for")
+            return
+
+        self.worker.submit(lambda: self.db.search(value), self.show_search_all_results, key="search")
+
+    def show_search_all_results(self, results):
+        if not results:
+            messagebox.showinfo("Info", "No results found")
+            return
+
+        search_result_window = tk.Toplevel(self.root)
+        search_result_window.title("Search Results")
+        columns = ("table", "id", "task_id", "match")
+        result_tree = ttk.Treeview(search_result_window, columns=columns, show="headings")
+        for col in columns:
+            result_tree.heading(col, text=col)
+            result_tree.column(col, width=100)
+        result_tree.column("match", width=400)
+        result_tree.pack(expand=True, fill=tk.BOTH)
+
+        for row in results:
+            result_tree.insert("", "end", values=row, tags=("clickable",))
+
+        result_tree.tag_bind("clickable", "<ButtonRelease-1>", lambda event: self.on_search_result_click(event, result_tree, SEARCH_ALL))
+
     def on_search_result_click(self, event, result_tree, table):
         selected_item = result_tree.selection()[0]
         item_values = result_tree.item(selected_item, "values")
         related_id = item_values[0]  # Assuming the first column is the ID of the searched table
 
-        if table == "task":
+        if table == SEARCH_ALL:
+            # Full-text hits already carry their table and owning task
+            table, related_id, task_id = item_values[0], item_values[1], item_values[2]
+        elif table == "task":
             task_id = related_id
         elif table == "delivery":
             task_id = self.db.fetch_one("SELECT task_id FROM task_delivery WHERE delivery_id = ?", (related_id,))[0]
@@ -1732,18 +1881,27 @@ class TaskManagerApp:
             messagebox.showwarning("Warning", "Unsupported table for search results")
             return
 
-        # Select the related task in the main tree
-        self.tree.selection_set(task_id)
-        self.tree.focus(task_id)
-        self.tree.see(task_id)
+        def select_task():
+            # Select the related task in the main tree
+            self.tree.selection_set(task_id)
+            self.tree.focus(task_id)
+            self.tree.see(task_id)
 
-        # Load related data for the selected task
-        self.load_related_data([task_id])
+            # Load related data for the selected task
+            self.load_related_data([task_id])
+
+            self.related_to_select_next = (table, related_id)
 
-        self.related_to_select_next = (table, related_id)
+        self.reveal_task(task_id, select_task)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    db_path = load_db_path(config_file_path)
     root = tk.Tk()
-    app = TaskManagerApp(root)
+    app = TaskManagerApp(root, db_path)
     root.mainloop()
+    app.worker.stop()
+    if app.render_pool is not None:
+        app.render_pool.shutdown(cancel_futures=True)
+    app.db.close()
@@ -0,0 +1,614 @@
+import sqlite3
+
+
+# Schema migrations, applied in order at startup by Database.migrate().
+# The version of the last applied migration is stored in PRAGMA user_version,
+# so an existing database only runs the migrations it has not seen yet.
+# Never edit a migration once released: append a new one instead.
+
+
+def run_script(cursor, script):
+    """Execute a multi-statement script inside the current transaction.
+
+    Unlike executescript(), this does not commit first, so a failing migration
+    rolls back together with its user_version bump.
+    """
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            cursor.execute(statement)
+            statement = ""
+    if statement.strip():
+        cursor.execute(statement)
+
+
+def add_column_if_missing(cursor, table, column, definition):
+    columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _base_schema(cursor):
+    run_script(cursor, '''
+    CREATE TABLE IF NOT EXISTS task (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer TEXT,
+        name TEXT,
+        description TEXT,
+        started_at TEXT,
+        finished_at TEXT,
+        task_id INTEGER,
+        FOREIGN KEY(task_id) REFERENCES task(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS delivery (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        version TEXT,
+        server TEXT,
+        environment TEXT,
+        delivery_date_time TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS task_delivery (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        delivery_id INTEGER,
+        task_id INTEGER,
+        FOREIGN KEY(delivery_id) REFERENCES delivery(id),
+        FOREIGN KEY(task_id) REFERENCES task(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS link (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT,
+        raw_link TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS task_link (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER,
+        link_id INTEGER,
+        FOREIGN KEY(task_id) REFERENCES task(id),
+        FOREIGN KEY(link_id) REFERENCES link(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS tag (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT,
+        keywords TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS tag_task (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER,
+        tag_id INTEGER,
+        FOREIGN KEY(task_id) REFERENCES task(id),
+        FOREIGN KEY(tag_id) REFERENCES tag(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS tag_link (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        link_id INTEGER,
+        tag_id INTEGER,
+        FOREIGN KEY(link_id) REFERENCES link(id),
+        FOREIGN KEY(tag_id) REFERENCES tag(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS origin (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        type TEXT,
+        raw_link TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS task_origin (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER,
+        origin_id INTEGER,
+        FOREIGN KEY(task_id) REFERENCES task(id),
+        FOREIGN KEY(origin_id) REFERENCES origin(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS booking (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        description TEXT,
+        started_at TEXT,
+        ended_at TEXT,
+        duration TEXT,
+        task_id INTEGER,
+        origin_id INTEGER,
+        FOREIGN KEY(task_id) REFERENCES task(id),
+        FOREIGN KEY(origin_id) REFERENCES origin(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS note (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task_id INTEGER,
+        content TEXT,
+        FOREIGN KEY(task_id) REFERENCES task(id)
+    );
+
+    CREATE TABLE IF NOT EXISTS settings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        key TEXT UNIQUE,
+        value TEXT
+    );
+    ''')
+
+
+def _add_environment_and_origin_name(cursor):
+    # Databases created before these columns existed were patched by hand
+    # with AddColumn.sql; older ones still lack them.
+    add_column_if_missing(cursor, "delivery", "environment", "TEXT")
+    add_column_if_missing(cursor, "origin", "name", "TEXT")
+
+
+def _foreign_key_indexes(cursor):
+    # Join tables are indexed on (task_id, other_id) so the relation joins are
+    # answered from the index alone, and on the other side for the reverse
+    # lookups done when opening a search result.
+    run_script(cursor, '''
+    CREATE INDEX IF NOT EXISTS idx_task_task_id ON task(task_id);
+    CREATE INDEX IF NOT EXISTS idx_task_delivery_task ON task_delivery(task_id, delivery_id);
+    CREATE INDEX IF NOT EXISTS idx_task_delivery_delivery ON task_delivery(delivery_id, task_id);
+    CREATE INDEX IF NOT EXISTS idx_task_link_task ON task_link(task_id, link_id);
+    CREATE INDEX IF NOT EXISTS idx_task_link_link ON task_link(link_id, task_id);
+    CREATE INDEX IF NOT EXISTS idx_tag_task_task ON tag_task(task_id, tag_id);
+    CREATE INDEX IF NOT EXISTS idx_tag_task_tag ON tag_task(tag_id, task_id);
+    CREATE INDEX IF NOT EXISTS idx_task_origin_task ON task_origin(task_id, origin_id);
+    CREATE INDEX IF NOT EXISTS idx_task_origin_origin ON task_origin(origin_id, task_id);
+    CREATE INDEX IF NOT EXISTS idx_booking_task ON booking(task_id);
+    CREATE INDEX IF NOT EXISTS idx_note_task ON note(task_id);
+    ANALYZE;
+    ''')
+
+
+def _environment_rank(cursor):
+    # Deliveries are listed by ascending environment rank in reports;
+    # environments without a row rank 0, so PROD comes last by default.
+    run_script(cursor, '''
+    CREATE TABLE IF NOT EXISTS environment_rank (
+        environment TEXT PRIMARY KEY,
+        rank INTEGER NOT NULL DEFAULT 0
+    );
+    INSERT OR IGNORE INTO environment_rank (environment, rank) VALUES ('PROD', 1);
+    ''')
+
+
+# Full-text search. search_document holds one row per (searchable row, owning
+# task) and search_fts indexes it as an external-content FTS5 table. Rows
+# reached through a join table (delivery, link, tag, origin) get one document
+# per task they are attached to.
+SEARCH_SOURCES = {
+    # source table: (indexed columns, join table, join column)
+    "task": (("customer", "name", "description"), None, None),
+    "note": (("content",), None, None),
+    "booking": (("description",), None, None),
+    "delivery": (("version", "server", "environment"), "task_delivery", "delivery_id"),
+    "link": (("type", "raw_link"), "task_link", "link_id"),
+    "tag": (("type", "keywords"), "tag_task", "tag_id"),
+    "origin": (("name", "type", "raw_link"), "task_origin", "origin_id"),
+}
+
+
+def _search_body(alias, columns):
+    return " || ' ' || ".join(f"COALESCE({alias}.{column}, '')" for column in columns)
+
+
+def _search_triggers(source, columns, join_table, join_column):
+    columns_list = ", ".join(columns)
+    if join_table is None:
+        owner = "new.id" if source == "task" else "new.task_id"
+        watched = columns_list if source == "task" else f"{columns_list}, task_id"
+        return f'''
+        CREATE TRIGGER IF NOT EXISTS search_{source}_ai AFTER INSERT ON {source} BEGIN
+            INSERT INTO search_document (source, source_id, task_id, body) VALUES ('{source}', new.id, {owner}, {_search_body("new", columns)});
+        END;
+        CREATE TRIGGER IF NOT EXISTS search_{source}_au AFTER UPDATE OF {watched} ON {source} BEGIN
+            DELETE FROM search_document WHERE source = '{source}' AND source_id = old.id;
+            INSERT INTO search_document (source, source_id, task_id, body) VALUES ('{source}', new.id, {owner}, {_search_body("new", columns)});
+        END;
+        CREATE TRIGGER IF NOT EXISTS search_{source}_ad AFTER DELETE ON {source} BEGIN
+            DELETE FROM search_document WHERE source = '{source}' AND source_id = old.id;
+        END;
+        '''
+    return f'''
+    CREATE TRIGGER IF NOT EXISTS search_{join_table}_ai AFTER INSERT ON {join_table} BEGIN
+        INSERT INTO search_document (source, source_id, task_id, body)
+        SELECT '{source}', x.id, new.task_id, {_search_body("x", columns)} FROM {source} x WHERE x.id = new.{join_column};
+    END;
+    CREATE TRIGGER IF NOT EXISTS search_{join_table}_ad AFTER DELETE ON {join_table} BEGIN
+        DELETE FROM search_document WHERE source = '{source}' AND source_id = old.{join_column} AND task_id IS old.task_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS search_{source}_au AFTER UPDATE OF {columns_list} ON {source} BEGIN
+        DELETE FROM search_document WHERE source = '{source}' AND source_id = old.id;
+        INSERT INTO search_document (source, source_id, task_id, body)
+        SELECT '{source}', new.id, j.task_id, {_search_body("new", columns)} FROM {join_table} j WHERE j.{join_column} = new.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS search_{source}_ad AFTER DELETE ON {source} BEGIN
+        DELETE FROM search_document WHERE source = '{source}' AND source_id = old.id;
+    END;
+    '''
+
+
+def _full_text_search(cursor):
+    run_script(cursor, '''
+    CREATE TABLE IF NOT EXISTS search_document (
+        id INTEGER PRIMARY KEY,
+        source TEXT NOT NULL,
+        source_id INTEGER NOT NULL,
+        task_id INTEGER,
+        body TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_search_document_source ON search_document(source, source_id);
+
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        body,
+        content='search_document',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    );
+
+    CREATE TRIGGER IF NOT EXISTS search_document_ai AFTER INSERT ON search_document BEGIN
+        INSERT INTO search_fts (rowid, body) VALUES (new.id, new.body);
+    END;
+    CREATE TRIGGER IF NOT EXISTS search_document_ad AFTER DELETE ON search_document BEGIN
+        INSERT INTO search_fts (search_fts, rowid, body) VALUES ('delete', old.id, old.body);
+    END;
+    ''')
+
+    for source, (columns, join_table, join_column) in SEARCH_SOURCES.items():
+        run_script(cursor, _search_triggers(source, columns, join_table, join_column))
+
+        # Index the rows that existed before the triggers
+        if join_table is None:
+            owner = "x.id" if source == "task" else "x.task_id"
+            cursor.execute(f"INSERT INTO search_document (source, source_id, task_id, body) SELECT '{source}', x.id, {owner}, {_search_body('x', columns)} FROM {source} x")
+        else:
+            cursor.execute(f"INSERT INTO search_document (source, source_id, task_id, body) SELECT '{source}', x.id, j.task_id, {_search_body('x', columns)} FROM {join_table} j JOIN {source} x ON x.id = j.{join_column}")
+
+
+def _task_child_count(cursor):
+    # Number of direct subtasks, so a lazily loaded tree knows which nodes
+    # can be expanded without querying their children.
+    add_column_if_missing(cursor, "task", "child_count", "INTEGER NOT NULL DEFAULT 0")
+    run_script(cursor, '''
+    UPDATE task SET child_count = (SELECT COUNT(*) FROM task c WHERE c.task_id = task.id);
+
+    CREATE TRIGGER IF NOT EXISTS task_child_count_ai AFTER INSERT ON task WHEN new.task_id IS NOT NULL BEGIN
+        UPDATE task SET child_count = child_count + 1 WHERE id = new.task_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS task_child_count_ad AFTER DELETE ON task WHEN old.task_id IS NOT NULL BEGIN
+        UPDATE task SET child_count = child_count - 1 WHERE id = old.task_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS task_child_count_au AFTER UPDATE OF task_id ON task WHEN old.task_id IS NOT new.task_id BEGIN
+        UPDATE task SET child_count = child_count - 1 WHERE id = old.task_id;
+        UPDATE task SET child_count = child_count + 1 WHERE id = new.task_id;
+    END;
+    ''')
+
+
+def _task_filter_indexes(cursor):
+    # Indexes for the filters of the paged task view, which walks the task
+    # table by id a page at a time.
+    run_script(cursor, '''
+    CREATE INDEX IF NOT EXISTS idx_task_customer ON task(customer, id);
+    CREATE INDEX IF NOT EXISTS idx_task_started_at ON task(started_at);
+    ''')
+
+
+# Timestamps are stored as ISO text; each of these columns gets an integer
+# Unix epoch twin named <column>_epoch, kept in sync by triggers, so range
+# filters and duration arithmetic are indexed integer operations.
+EPOCH_COLUMNS = {
+    "task": ("started_at", "finished_at"),
+    "delivery": ("delivery_date_time",),
+    "booking": ("started_at", "ended_at"),
+}
+
+
+def _epoch(expression):
+    # NULL for empty or unparseable text
+    return f"CAST(strftime('%s', {expression}) AS INTEGER)"
+
+
+def _timestamp_epochs(cursor):
+    for table, columns in EPOCH_COLUMNS.items():
+        for column in columns:
+            add_column_if_missing(cursor, table, f"{column}_epoch", "INTEGER")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_{column}_epoch ON {table}({column}_epoch)")
+
+        assignments = ", ".join(f"{column}_epoch = {_epoch(column)}" for column in columns)
+        cursor.execute(f"UPDATE {table} SET {assignments}")
+        run_script(cursor, f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_epoch_ai AFTER INSERT ON {table} BEGIN
+            UPDATE {table} SET {assignments} WHERE id = new.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS {table}_epoch_au AFTER UPDATE OF {", ".join(columns)} ON {table} BEGIN
+            UPDATE {table} SET {assignments} WHERE id = new.id;
+        END;
+        ''')
+
+    # Superseded by the epoch index for the start-date filter
+    cursor.execute("DROP INDEX IF EXISTS idx_task_started_at")
+
+
+def _duration_minutes(alias):
+    """SQL for a booking's length in whole minutes.
+
+    Taken from started_at/ended_at when both parse, otherwise from the free
+    text duration: "1:30", "1h30", "1h", "45m" or "45 min", and a plain
+    number such as "1.5" or "1,5" counts as hours.
+    """
+    duration = f"lower(trim({alias}.duration))"
+    return f'''CASE
+            WHEN {_epoch(f"{alias}.ended_at")} >= {_epoch(f"{alias}.started_at")}
+                THEN ({_epoch(f"{alias}.ended_at")} - {_epoch(f"{alias}.started_at")}) / 60
+            WHEN {duration} IS NULL OR {duration} = '' THEN NULL
+            WHEN instr({duration}, ':') > 0
+                THEN CAST(substr({duration}, 1, instr({duration}, ':') - 1) AS INTEGER) * 60 + CAST(substr({duration}, instr({duration}, ':') + 1) AS INTEGER)
+            WHEN instr({duration}, 'h') > 0
+                THEN CAST(substr({duration}, 1, instr({duration}, 'h') - 1) AS INTEGER) * 60 + CAST(substr({duration}, instr({duration}, 'h') + 1) AS INTEGER)
+            WHEN instr({duration}, 'm') > 0 THEN CAST({duration} AS INTEGER)
+            ELSE CAST(round(CAST(replace({duration}, ',', '.') AS REAL) * 60) AS INTEGER)
+        END'''
+
+
+def _booking_duration_minutes(cursor):
+    add_column_if_missing(cursor, "booking", "duration_minutes", "INTEGER")
+    cursor.execute(f"UPDATE booking SET duration_minutes = {_duration_minutes('booking')}")
+    run_script(cursor, f'''
+    CREATE TRIGGER IF NOT EXISTS booking_duration_ai AFTER INSERT ON booking BEGIN
+        UPDATE booking SET duration_minutes = {_duration_minutes('new')} WHERE id = new.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS booking_duration_au AFTER UPDATE OF started_at, ended_at, duration ON booking BEGIN
+        UPDATE booking SET duration_minutes = {_duration_minutes('new')} WHERE id = new.id;
+    END;
+    ''')
+
+
+def _task_closure(cursor):
+    # Every (ancestor, descendant) pair of the task hierarchy with the number
+    # of levels between them, a task being its own ancestor at depth 0. The
+    # triggers keep it in step with task.task_id; a task whose parent is
+    # deleted becomes the root of its own subtree.
+    run_script(cursor, '''
+    CREATE TABLE IF NOT EXISTS task_closure (
+        ancestor INTEGER NOT NULL,
+        descendant INTEGER NOT NULL,
+        depth INTEGER NOT NULL,
+        PRIMARY KEY (ancestor, descendant)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_task_closure_descendant ON task_closure(descendant, depth);
+
+    DELETE FROM task_closure;
+    INSERT INTO task_closure (ancestor, descendant, depth)
+    WITH RECURSIVE pair(ancestor, descendant, depth) AS (
+        SELECT id, id, 0 FROM task
+        UNION ALL
+        SELECT p.ancestor, t.id, p.depth + 1 FROM pair p JOIN task t ON t.task_id = p.descendant
+    )
+    SELECT ancestor, descendant, depth FROM pair;
+
+    CREATE TRIGGER IF NOT EXISTS task_closure_ai AFTER INSERT ON task BEGIN
+        INSERT INTO task_closure (ancestor, descendant, depth) VALUES (new.id, new.id, 0);
+        INSERT INTO task_closure (ancestor, descendant, depth)
+        SELECT ancestor, new.id, depth + 1 FROM task_closure WHERE descendant = new.task_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS task_closure_au AFTER UPDATE OF task_id ON task WHEN old.task_id IS NOT new.task_id BEGIN
+        -- Detach the subtree from its old ancestors, then hang it under the new parent's
+        DELETE FROM task_closure
+        WHERE descendant IN (SELECT descendant FROM task_closure WHERE ancestor = new.id)
+          AND ancestor IN (SELECT ancestor FROM task_closure WHERE descendant = new.id AND depth > 0);
+        INSERT INTO task_closure (ancestor, descendant, depth)
+        SELECT a.ancestor, d.descendant, a.depth + d.depth + 1
+        FROM task_closure a, task_closure d
+        WHERE a.descendant = new.task_id AND d.ancestor = new.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS task_closure_ad AFTER DELETE ON task BEGIN
+        DELETE FROM task_closure
+        WHERE descendant IN (SELECT descendant FROM task_closure WHERE ancestor = old.id)
+          AND ancestor IN (SELECT ancestor FROM task_closure WHERE descendant = old.id);
+    END;
+    ''')
+
+
+
+# Stamp of each task's report fragment: task.modified_stamp is raised past
+# every other task's when the task or one of its deliveries or origins
+# changes. A counter rather than a time, so two edits in the same second
+# still differ.
+NEXT_STAMP = "(SELECT COALESCE(MAX(modified_stamp), 0) + 1 FROM task)"
+
+
+def _report_cache(cursor):
+    # Rendered report fragments per task, valid while their stamp and indent
+    # match. last_used orders the rows for LRU eviction. Delivery ordering
+    # depends on environment_rank, so changing it empties the cache.
+    add_column_if_missing(cursor, "task", "modified_stamp", "INTEGER NOT NULL DEFAULT 0")
+    run_script(cursor, f'''
+    CREATE INDEX IF NOT EXISTS idx_task_modified_stamp ON task(modified_stamp);
+
+    CREATE TABLE IF NOT EXISTS report_cache (
+        task_id INTEGER PRIMARY KEY,
+        stamp INTEGER NOT NULL,
+        indent_level INTEGER NOT NULL,
+        html TEXT NOT NULL,
+        last_used INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_report_cache_last_used ON report_cache(last_used);
+
+    CREATE TRIGGER IF NOT EXISTS task_stamp_au AFTER UPDATE OF customer, name, description ON task BEGIN
+        UPDATE task SET modified_stamp = {NEXT_STAMP} WHERE id = new.id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS task_report_cache_ad AFTER DELETE ON task BEGIN
+        DELETE FROM report_cache WHERE task_id = old.id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS task_delivery_stamp_ai AFTER INSERT ON task_delivery BEGIN
+        UPDATE task SET modified_stamp = {NEXT_STAMP} WHERE id = new.task_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS task_delivery_stamp_ad AFTER DELETE ON task_delivery BEGIN
+        UPDATE task SET modified_stamp = {NEXT_STAMP} WHERE id = old.task_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS delivery_stamp_au AFTER UPDATE ON delivery BEGIN
+        UPDATE task SET modified_stamp = {NEXT_STAMP}
+        WHERE id IN (SELECT task_id FROM task_delivery WHERE delivery_id = new.id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS task_origin_stamp_ai AFTER INSERT ON task_origin BEGIN
+        UPDATE task SET modified_stamp = {NEXT_STAMP} WHERE id = new.task_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS task_origin_stamp_ad AFTER DELETE ON task_origin BEGIN
+        UPDATE task SET modified_stamp = {NEXT_STAMP} WHERE id = old.task_id;
+    END;
+    CREATE TRIGGER IF NOT EXISTS origin_stamp_au AFTER UPDATE ON origin BEGIN
+        UPDATE task SET modified_stamp = {NEXT_STAMP}
+        WHERE id IN (SELECT task_id FROM task_origin WHERE origin_id = new.id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS environment_rank_cache_ai AFTER INSERT ON environment_rank BEGIN
+        DELETE FROM report_cache;
+    END;
+    CREATE TRIGGER IF NOT EXISTS environment_rank_cache_au AFTER UPDATE ON environment_rank BEGIN
+        DELETE FROM report_cache;
+    END;
+    CREATE TRIGGER IF NOT EXISTS environment_rank_cache_ad AFTER DELETE ON environment_rank BEGIN
+        DELETE FROM report_cache;
+    END;
+    ''')
+
+
+def _report_cache_relation_triggers(cursor):
+    # Deleting a delivery or origin leaves its task_delivery or task_origin
+    # rows behind, so the link triggers of migration 11 do not see it; the
+    # tasks are stamped from the deleted row instead. Moving a link to another
+    # task stamps both tasks.
+    run_script(cursor, f'''
+    CREATE TRIGGER IF NOT EXISTS delivery_stamp_ad AFTER DELETE ON delivery BEGIN
+        UPDATE task SET modified_stamp = {NEXT_STAMP}
+        WHERE id IN (SELECT task_id FROM task_delivery WHERE delivery_id = old.id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS origin_stamp_ad AFTER DELETE ON origin BEGIN
+        UPDATE task SET modified_stamp = {NEXT_STAMP}
+        WHERE id IN (SELECT task_id FROM task_origin WHERE origin_id = old.id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS task_delivery_stamp_au AFTER UPDATE ON task_delivery BEGIN
+        UPDATE task SET modified_stamp = {NEXT_STAMP} WHERE id IN (old.task_id, new.task_id);
+    END;
+    CREATE TRIGGER IF NOT EXISTS task_origin_stamp_au AFTER UPDATE ON task_origin BEGIN
+        UPDATE task SET modified_stamp = {NEXT_STAMP} WHERE id IN (old.task_id, new.task_id);
+    END;
+    ''')
+
+
+def _task_filter_indexes_rebuild(cursor):
+    # Puts every database, whatever migrations 7 and 8 did to it, on the same
+    # task filter indexes: the customer filter's, and the start-date filter
+    # only on the epoch index of migration 8.
+    run_script(cursor, '''
+    DROP INDEX IF EXISTS idx_task_started_at;
+    DROP INDEX IF EXISTS idx_task_customer;
+    CREATE INDEX idx_task_customer ON task(customer, id);
+    CREATE INDEX IF NOT EXISTS idx_task_started_at_epoch ON task(started_at_epoch);
+    ''')
+
+
+def _is_number(expr):
+    # A non-negative decimal such as 2, 1.5 or .5: digits and at most one dot
+    return f"({expr} != '' AND {expr} != '.' AND {expr} NOT GLOB '*[^0-9.]*' AND {expr} NOT GLOB '*.*.*')"
+
+
+def _is_integer(expr):
+    return f"({expr} != '' AND {expr} NOT GLOB '*[^0-9]*')"
+
+
+def _parse_duration_minutes(alias):
+    """SQL for a booking's length in whole minutes, NULL when unknown.
+
+    Taken from started_at/ended_at when both parse, otherwise from the free
+    text duration: "1:30", "1h30", "1.5h", "1,5h", "1h30m", "45m" or
+    "45 min", and a plain number such as "1.5" or "1,5" counts as hours.
+    Text that does not parse, negative durations included, gives NULL.
+    """
+    # Lower case, decimal comma as a dot, without spaces
+    duration = f"replace(replace(lower(trim({alias}.duration)), ',', '.'), ' ', '')"
+    colon = f"instr({duration}, ':')"
+    hours_at = f"instr({duration}, 'h')"
+    clock_hours = f"substr({duration}, 1, {colon} - 1)"
+    clock_minutes = f"substr({duration}, {colon} + 1)"
+    hours = f"substr({duration}, 1, {hours_at} - 1)"
+    # What follows the h, without a trailing m or min
+    extra_minutes = f"rtrim(substr({duration}, {hours_at} + 1), 'min')"
+    minutes = f"rtrim({duration}, 'min')"
+    return f'''CASE
+            WHEN {_epoch(f"{alias}.ended_at")} >= {_epoch(f"{alias}.started_at")}
+                THEN ({_epoch(f"{alias}.ended_at")} - {_epoch(f"{alias}.started_at")}) / 60
+            WHEN {duration} IS NULL OR {duration} = '' THEN NULL
+            WHEN {colon} > 0 THEN CASE
+                WHEN {_is_integer(clock_hours)} AND {_is_integer(clock_minutes)}
+                    THEN CAST({clock_hours} AS INTEGER) * 60 + CAST({clock_minutes} AS INTEGER)
+                END
+            WHEN {hours_at} > 0 THEN CASE
+                WHEN {_is_number(hours)} AND ({extra_minutes} = '' OR {_is_integer(extra_minutes)})
+                    THEN CAST(round(CAST({hours} AS REAL) * 60 + CAST({extra_minutes} AS INTEGER)) AS INTEGER)
+                END
+            WHEN {minutes} != {duration} THEN CASE
+                WHEN {_is_number(minutes)} THEN CAST(round(CAST({minutes} AS REAL)) AS INTEGER)
+                END
+            WHEN {_is_number(duration)} THEN CAST(round(CAST({duration} AS REAL) * 60) AS INTEGER)
+        END'''
+
+
+def _booking_duration_parsing(cursor):
+    # Migration 9 cut decimal hours down to whole hours and read any other
+    # text, negative numbers included, as a duration: recompute every booking
+    # with the stricter parser.
+    run_script(cursor, f'''
+    DROP TRIGGER IF EXISTS booking_duration_ai;
+    DROP TRIGGER IF EXISTS booking_duration_au;
+    UPDATE booking SET duration_minutes = {_parse_duration_minutes('booking')};
+    CREATE TRIGGER booking_duration_ai AFTER INSERT ON booking BEGIN
+        UPDATE booking SET duration_minutes = {_parse_duration_minutes('new')} WHERE id = new.id;
+    END;
+    CREATE TRIGGER booking_duration_au AFTER UPDATE OF started_at, ended_at, duration ON booking BEGIN
+        UPDATE booking SET duration_minutes = {_parse_duration_minutes('new')} WHERE id = new.id;
+    END;
+    ''')
+
+
+def _task_closure_reroot(cursor):
+    # Migration 10 cut a deleted task's subtasks off their ancestors in
+    # task_closure but left its id in their task_id. They now get a NULL
+    # parent, task_closure_au detaching each of their subtrees.
+    run_script(cursor, '''
+    DROP TRIGGER IF EXISTS task_closure_ad;
+    CREATE TRIGGER task_closure_ad AFTER DELETE ON task BEGIN
+        UPDATE task SET task_id = NULL WHERE task_id = old.id;
+        DELETE FROM task_closure WHERE ancestor = old.id OR descendant = old.id;
+    END;
+
+    -- Subtasks already orphaned by earlier deletes
+    UPDATE task SET task_id = NULL WHERE task_id IS NOT NULL AND task_id NOT IN (SELECT id FROM task);
+    ''')
+
+# (version, description, function applying the migration to a cursor)
+MIGRATIONS = [
+    (1, "base schema", _base_schema),
+    (2, "delivery.environment and origin.name columns", _add_environment_and_origin_name),
+    (3, "indexes on foreign keys", _foreign_key_indexes),
+    (4, "environment rank table for delivery ordering", _environment_rank),
+    (5, "full-text search index", _full_text_search),
+    (6, "cached subtask count on task", _task_child_count),
+    (7, "indexes for the paged task view filters", _task_filter_indexes),
+    (8, "integer epoch columns next to the timestamps", _timestamp_epochs),
+    (9, "booking duration in minutes", _booking_duration_minutes),
+    (10, "closure table of the task hierarchy", _task_closure),
+    (11, "report fragment cache with task modification stamps", _report_cache),
+    (12, "report cache stamps on delivery and origin deletes", _report_cache_relation_triggers),
+    (13, "rebuild the task filter indexes", _task_filter_indexes_rebuild),
+    (14, "stricter booking duration parsing", _booking_duration_parsing),
+    (15, "re-root the subtasks of deleted tasks", _task_closure_reroot),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
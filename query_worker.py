@@ -0,0 +1,111 @@
+import queue
+import threading
+
+
+class QueryWorker:
+    """Runs database jobs on background threads and hands results back to Tk.
+
+    submit() queues a job for the worker threads; its result is passed to
+    on_done on the Tk thread by a root.after poll, so callbacks may touch
+    widgets. Submitting again with the same key supersedes the earlier job:
+    if it has not started it is skipped, and if it is running its result is
+    dropped. on_busy_change(busy) is called whenever work starts or stops.
+    """
+
+    def __init__(self, root, workers=2, poll_ms=20, on_busy_change=None):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.on_busy_change = on_busy_change
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._busy = False
+        self._threads = [threading.Thread(target=self._run, name=f"query-worker-{i}", daemon=True) for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+        self._after_id = self.root.after(self.poll_ms, self._poll)
+
+    def submit(self, job, on_done=None, key=None, on_error=None):
+        """Run job() off the Tk thread, then on_done(result) on it.
+
+        If job raises, on_error(exception) is called instead, or Tk's
+        report_callback_exception when no on_error is given.
+        """
+        with self._lock:
+            generation = self._generations.get(key, 0) + 1
+            if key is not None:
+                self._generations[key] = generation
+            self._in_flight += 1
+        self._jobs.put((key, generation, job, on_done, on_error))
+        self._update_busy()
+
+    def cancel(self, key):
+        """Drop the queued or running job submitted under key, if any."""
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def is_busy(self):
+        return self._in_flight > 0
+
+    def _is_current(self, key, generation):
+        with self._lock:
+            return key is None or self._generations.get(key) == generation
+
+    def _run(self):
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                return
+            key, generation, job, on_done, on_error = item
+            if not self._is_current(key, generation):
+                self._results.put(None)
+                continue
+            try:
+                outcome = (True, job())
+            except Exception as error:
+                outcome = (False, error)
+            self._results.put((key, generation, outcome, on_done, on_error))
+
+    def _poll(self):
+        while True:
+            try:
+                item = self._results.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._in_flight -= 1
+            if item is None:
+                continue
+            key, generation, (succeeded, value), on_done, on_error = item
+            if not self._is_current(key, generation):
+                continue
+            try:
+                if succeeded:
+                    if on_done:
+                        on_done(value)
+                elif on_error:
+                    on_error(value)
+                else:
+                    raise value
+            except Exception as error:
+                # Keep polling whatever a callback does
+                self.root.report_callback_exception(type(error), error, error.__traceback__)
+        self._update_busy()
+        self._after_id = self.root.after(self.poll_ms, self._poll)
+
+    def _update_busy(self):
+        # Only called from the Tk thread
+        busy = self.is_busy()
+        if busy != self._busy:
+            self._busy = busy
+            if self.on_busy_change:
+                self.on_busy_change(busy)
+
+    def stop(self, timeout=1.0):
+        self.root.after_cancel(self._after_id)
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
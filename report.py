@@ -0,0 +1,196 @@
+import time
+
+
+REPORT_CACHE_SIZE = 5000  # Task fragments kept in report_cache, least recently used dropped first
+
+class ReportModel:
+    """The selected tasks with their deliveries and origins, held in memory.
+
+    tasks maps a task id to (id, customer, name, description, started_at,
+    finished_at, task_id). children only links tasks that are both selected,
+    and roots lists the selected tasks whose parent is not selected, in
+    selection order. cached holds the fragments still valid in report_cache,
+    and rendered the (indent level, fragment) of the tasks rendered anew.
+    """
+
+    def __init__(self, task_ids):
+        self.task_ids = list(task_ids)
+        self.tasks = {}
+        self.children = {}
+        self.deliveries = {}
+        self.origins = {}
+        self.roots = []
+        self.stamps = {}
+        self.cached = {}
+        self.rendered = {}
+
+
+class ReportEngine:
+    """Builds the HTML status report for a selection of tasks.
+
+    The whole selection is fetched up front with one query per table, then
+    rendered from memory. After generate(), timings holds the seconds spent
+    in each phase.
+
+    The HTML of each task is cached in report_cache with the task's
+    modified_stamp, which triggers raise when the task, its deliveries or its
+    origins change. Tasks whose fragment is still valid are neither queried
+    for deliveries and origins nor rendered again. cache_size=0 turns the
+    cache off, store=False only reads it.
+    """
+
+    def __init__(self, db, cache_size=REPORT_CACHE_SIZE, store=True):
+        self.db = db
+        self.cache_size = cache_size
+        self.store_fragments = store
+        self.timings = {}
+        self.cached_tasks = (0, 0)
+
+    def generate(self, task_ids):
+        started = time.perf_counter()
+        model = self.fetch(task_ids)
+        fetched = time.perf_counter()
+        html = self.render(model)
+        rendered = time.perf_counter()
+        self.store(model)
+        stored = time.perf_counter()
+        self.timings = {"fetch": fetched - started, "render": rendered - fetched, "cache": stored - rendered}
+        self.cached_tasks = (len(model.cached), len(model.tasks))
+        return html
+
+    def format_timings(self):
+        timings = ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in self.timings.items())
+        return f"{timings}, {self.cached_tasks[0]}/{self.cached_tasks[1]} tasks cached"
+
+    def fetch(self, task_ids):
+        model = ReportModel(task_ids)
+        with self.db.selected_tasks(model.task_ids) as conn:
+            for task in conn.execute("""
+            SELECT t.id, t.customer, t.name, t.description, t.started_at, t.finished_at, t.task_id, t.modified_stamp
+            FROM temp.selected_task s
+            JOIN task t ON t.id = s.id
+            ORDER BY t.id"""):
+                model.tasks[task[0]] = task[:7]
+                model.stamps[task[0]] = task[7]
+
+            for task in model.tasks.values():
+                if task[6] in model.tasks:
+                    model.children.setdefault(task[6], []).append(task[0])
+            model.roots = [task_id for task_id in model.task_ids if task_id in model.tasks and model.tasks[task_id][6] not in model.tasks]
+
+            if self.cache_size:
+                indent_levels = self.indent_levels(model)
+                for task_id, stamp, indent_level, html in conn.execute("""
+                SELECT c.task_id, c.stamp, c.indent_level, c.html
+                FROM temp.selected_task s
+                JOIN report_cache c ON c.task_id = s.id"""):
+                    if model.stamps[task_id] == stamp and indent_levels.get(task_id) == indent_level:
+                        model.cached[task_id] = html
+                # Only the tasks rendered anew need their deliveries and origins
+                conn.executemany("DELETE FROM temp.selected_task WHERE id = ?", ((task_id,) for task_id in model.cached))
+
+            # Deliveries come back in report order: by environment rank (PROD
+            # last by default), then version and environment. new_group marks
+            # the first row of each run of identical (version, server). The
+            # date comes formatted from its epoch, e.g. 2024.05.17 14h30.
+            for row in conn.execute("""
+            SELECT td.task_id, d.version, d.server, d.environment,
+                   COALESCE(strftime('%Y.%m.%d %Hh%M', d.delivery_date_time_epoch, 'unixepoch'), d.delivery_date_time, '') AS delivery_date,
+                   CASE WHEN ROW_NUMBER() OVER w > 1
+                             AND LAG(d.version) OVER w IS d.version
+                             AND LAG(d.server) OVER w IS d.server
+                        THEN 0 ELSE 1 END AS new_group
+            FROM temp.selected_task s
+            JOIN task_delivery td ON td.task_id = s.id
+            JOIN delivery d ON d.id = td.delivery_id
+            LEFT JOIN environment_rank r ON r.environment = d.environment
+            WINDOW w AS (PARTITION BY td.task_id ORDER BY COALESCE(r.rank, 0), d.version, d.environment, d.id)
+            ORDER BY td.task_id, COALESCE(r.rank, 0), d.version, d.environment, d.id"""):
+                model.deliveries.setdefault(row[0], []).append(row[1:])
+
+            for row in conn.execute("""
+            SELECT t_o.task_id, o.name, o.type, o.raw_link
+            FROM temp.selected_task s
+            JOIN task_origin t_o ON t_o.task_id = s.id
+            JOIN origin o ON o.id = t_o.origin_id
+            ORDER BY t_o.task_id, o.id"""):
+                model.origins.setdefault(row[0], []).append(row[1:])
+        return model
+
+    def indent_levels(self, model):
+        """Return {task id: indent level} as render() will lay the tasks out."""
+        levels = {}
+        stack = [(task_id, 0) for task_id in reversed(model.roots)]
+        while stack:
+            task_id, level = stack.pop()
+            if task_id in levels:
+                continue
+            levels[task_id] = level
+            stack.extend((child_id, level + 1) for child_id in reversed(model.children.get(task_id, [])))
+        return levels
+
+    def store(self, model):
+        """Save the fragments rendered anew, mark the cached ones used and evict past cache_size."""
+        if not self.cache_size or not self.store_fragments:
+            return
+        with self.db.transaction() as cursor:
+            used = cursor.execute("SELECT COALESCE(MAX(last_used), 0) + 1 FROM report_cache").fetchone()[0]
+            cursor.executemany("INSERT OR REPLACE INTO report_cache (task_id, stamp, indent_level, html, last_used) VALUES (?, ?, ?, ?, ?)",
+                               ((task_id, model.stamps[task_id], indent_level, html, used) for task_id, (indent_level, html) in model.rendered.items()))
+            cursor.executemany("UPDATE report_cache SET last_used = ? WHERE task_id = ?", ((used, task_id) for task_id in model.cached))
+            cursor.execute("DELETE FROM report_cache WHERE task_id IN (SELECT task_id FROM report_cache ORDER BY last_used DESC, task_id DESC LIMIT -1 OFFSET ?)", (self.cache_size,))
+
+    def render(self, model):
+        report_lines = []
+        visited_tasks = set()
+        for task_id in model.roots:
+            self.add_task_to_report(model, task_id, report_lines, visited_tasks)
+            report_lines.append("</ul>")
+        return "\n".join(report_lines)
+
+    def add_task_to_report(self, model, task_id, report_lines, visited_tasks, indent_level=0):
+        if task_id in visited_tasks:
+            return
+        visited_tasks.add(task_id)
+
+        if task_id in model.cached:
+            report_lines.append(model.cached[task_id])
+        else:
+            task_lines = []
+            self.add_task_lines(model, task_id, task_lines, indent_level)
+            html = "\n".join(task_lines)
+            model.rendered[task_id] = (indent_level, html)
+            report_lines.append(html)
+
+        # Recursively add child tasks
+        for child_id in model.children.get(task_id, []):
+            self.add_task_to_report(model, child_id, report_lines, visited_tasks, indent_level + 1)
+
+    def add_task_lines(self, model, task_id, task_lines, indent_level):
+        """Append the HTML lines of one task, without its subtasks."""
+        task = model.tasks[task_id]
+        one = 1
+        indent = "    " * indent_level
+        sub_indent = "    " * one
+        if task[1] != "":
+            task_lines.append(f"{indent}<p><strong>{task[1]}</strong>: <code>{task[2]}</code><p><ul>")
+            task_lines.append(f"{indent}{sub_indent}<li>Description: {task[3]}</li>")
+        else:
+            task_lines.append(f"{indent}<li>Sub-task: <code>{task[2]}</code></li><ul>")
+            task_lines.append(f"{indent}{sub_indent}<li>Description: {task[3]}</li>")
+
+        deliveries = model.deliveries.get(task_id)
+        if deliveries:
+            task_lines.append(f"{indent}{sub_indent}<li>Deliveries:</li><ul>")
+
+            close_list_tag = ""
+            for version, server, environment, delivery_date, new_group in deliveries:
+                if new_group:
+                    task_lines.append(f"{close_list_tag}{indent}{sub_indent}{sub_indent}<li>V {version}, {server}:</li><ul>") # new version or server
+                    close_list_tag = "</ul>"
+                task_lines.append(f"{indent}{sub_indent}{sub_indent}{sub_indent}<li>[x] {environment}, {delivery_date}")
+
+            task_lines.append("</ul></ul>")
+
+        for origin in model.origins.get(task_id, []):
+            task_lines.append(f"{indent}{sub_indent}<li><a href=\"{origin[2]}\">BCS: {origin[0]}</a></li>")
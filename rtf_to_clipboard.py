@@ -1,5 +1,6 @@
 import win32clipboard
 import html2text
+from html_to_rtf import html_to_rtf
 
 
 def copy_to_clipboard(rtf_content, plain_text_content, html_content):
@@ -78,26 +79,6 @@ def create_html_with_fragment(html_body):
     html_content = html_header.format(start_html, end_html, start_fragment, end_fragment) + html_body
     return html_content
 
-def html_to_rtf(html_body):
-    from bs4 import BeautifulSoup
-
-    soup = BeautifulSoup(html_body, 'html.parser')
-    rtf_content = r"""{\rtf1\ansi\ansicpg1252\deff0\nouicompat{\fonttbl{\f0\fnil\fcharset0 Calibri;}}
-{\*\generator Riched20 10.0.18362;}viewkind4\uc1
-"""
-
-    for tag in soup.descendants:
-        if tag.name == 'p':
-            rtf_content += r"\pard "
-            if tag.strong:
-                rtf_content += r"\b "
-            if tag.em:
-                rtf_content += r"\i "
-            rtf_content += tag.get_text().replace('\n', ' ') + r" \par "
-
-    rtf_content += r"}"
-    return rtf_content
-
 
 
 # HTML content to copy
@@ -0,0 +1,81 @@
+from database import task_sort_key
+
+
+class TaskPager:
+    """Keyset pagination over the task table for the paged view.
+
+    Filters are applied in SQL, and each page continues from the sort key of
+    the last row already shown, so fetching any page costs the same however
+    far the user has scrolled. Pages are addressed by task id; the key of that
+    task is looked up in the same query. Rows are (id, customer, name,
+    description, started_at, finished_at, task_id, child_count).
+    """
+
+    def __init__(self, db, page_size=200, active_only=False, customer=None, started_from=None, started_to=None, sort_column=None, descending=False):
+        self.db = db
+        self.page_size = page_size
+        self.sort_key = task_sort_key(sort_column)
+        self.descending = descending
+        self.active_only = active_only
+        self.customer = customer
+        self.started_from = started_from
+        self.started_to = started_to
+
+    def _filters(self):
+        clauses = []
+        params = []
+        if self.active_only:
+            clauses.append("(finished_at IS NULL OR finished_at = '')")
+        if self.customer:
+            clauses.append("customer = ?")
+            params.append(self.customer)
+        if self.started_from:
+            clauses.append("started_at_epoch >= CAST(strftime('%s', ?) AS INTEGER)")
+            params.append(self.started_from)
+        if self.started_to:
+            # Up to the end of the last day
+            clauses.append("started_at_epoch < CAST(strftime('%s', ?, '+1 day') AS INTEGER)")
+            params.append(self.started_to)
+        return clauses, params
+
+    def _fetch(self, comparison=None, task_id=None, backward=False):
+        clauses, params = self._filters()
+        if comparison:
+            clauses.append(f"({self.sort_key}, id) {comparison} (SELECT {self.sort_key}, id FROM task WHERE id = ?)")
+            params.append(task_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "DESC" if self.descending != backward else "ASC"
+        rows = self.db.fetch_all(f"""
+        SELECT id, customer, name, description, started_at, finished_at, task_id, child_count
+        FROM task
+        {where}
+        ORDER BY {self.sort_key} {order}, id {order}
+        LIMIT ?""", params + [self.page_size + 1])
+
+        # One extra row tells whether there is anything past this page
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backward:
+            rows.reverse()
+        return rows, has_more
+
+    def first_page(self):
+        """Return (rows, more rows after)."""
+        return self._fetch()
+
+    def page_after(self, last_id):
+        """Return (rows after task last_id, more rows after them)."""
+        return self._fetch("<" if self.descending else ">", last_id)
+
+    def page_from(self, first_id):
+        """Return (rows from task first_id on, more rows after them)."""
+        return self._fetch("<=" if self.descending else ">=", first_id)
+
+    def page_before(self, first_id):
+        """Return (rows before task first_id, more rows before them)."""
+        return self._fetch(">" if self.descending else "<", first_id, backward=True)
+
+    def count(self):
+        clauses, params = self._filters()
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.db.fetch_one(f"SELECT COUNT(*) FROM task {where}", params)[0]
@@ -0,0 +1,59 @@
+import unittest
+
+from autocomplete import Autocomplete, ColumnIndex
+from database import Database
+
+
+class ColumnIndexTest(unittest.TestCase):
+    def test_prefix_matches_come_first_then_by_count_and_recency(self):
+        index = ColumnIndex([("Beta", 1, 1), ("Alpha", 1, 2), ("alphabet", 3, 3), ("Gamma al", 5, 4)])
+        self.assertEqual(index.suggest("al"), ["alphabet", "Alpha", "Gamma al"])
+        index.add("Alpha")
+        index.add("Alpha")
+        index.add("Alpha")
+        # Same count as alphabet, but used more recently
+        self.assertEqual(index.suggest("al"), ["Alpha", "alphabet", "Gamma al"])
+        self.assertEqual(index.suggest("", limit=2), ["Gamma al", "Alpha"])
+
+    def test_remove_forgets_a_value_after_its_last_use(self):
+        index = ColumnIndex([("ACME", 2, 1)])
+        index.remove("ACME")
+        self.assertEqual(index.suggest("ac"), ["ACME"])
+        index.remove("ACME")
+        self.assertEqual(index.suggest("ac"), [])
+        index.remove("missing")
+
+
+class AutocompleteTest(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(":memory:")
+        self.autocomplete = Autocomplete(self.db)
+        for customer in ("ACME", "ACME", "Acmos"):
+            self.db.execute_query("INSERT INTO task (customer, name, description) VALUES (?, 'n', 'd')", (customer,))
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_new_rows_are_counted(self):
+        self.assertEqual(self.autocomplete.suggest("task", "customer", "ac"), ["ACME", "Acmos"])
+        self.autocomplete.record("task", customer="Acmos")
+        self.autocomplete.record("task", customer="Acmos")
+        self.assertEqual(self.autocomplete.suggest("task", "customer", "ac"), ["Acmos", "ACME"])
+
+    def test_edited_rows_replace_their_old_values(self):
+        self.assertEqual(self.autocomplete.suggest("task", "customer", "ac"), ["ACME", "Acmos"])
+        # Correct both ACME tasks to Acme
+        for _ in range(2):
+            self.autocomplete.record("task", {"customer": "ACME", "name": "n"}, customer="Acme", name="n")
+        self.assertEqual(self.autocomplete.suggest("task", "customer", "ac"), ["Acme", "Acmos"])
+        self.assertEqual(self.autocomplete.suggest("task", "name", ""), ["n"])
+
+    def test_unchanged_edit_keeps_the_count(self):
+        self.autocomplete.suggest("task", "customer", "")
+        self.autocomplete.record("task", {"customer": "Acmos"}, customer="Acmos")
+        self.autocomplete.record("task", {"customer": "Acmos"}, customer="Acmos")
+        self.assertEqual(self.autocomplete.suggest("task", "customer", "ac"), ["ACME", "Acmos"])
+
+
+if __name__ == "__main__":
+    unittest.main()
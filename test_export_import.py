@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+
+from database import Database
+from exporter import Exporter
+from importer import Importer
+
+
+class ExportImportTest(unittest.TestCase):
+    def setUp(self):
+        self.source = Database(":memory:")
+        for customer, name, parent in (("ACME", "root", None), ("", "child", 1), ("Initech", "other", None), ("", "moved", None)):
+            self.source.execute_query("INSERT INTO task (customer, name, description, started_at, task_id) VALUES (?, ?, 'd', '2024-01-01T10:00:00', ?)", (customer, name, parent))
+        # A parent created after its subtask, and a gap in the ids
+        self.source.execute_query("UPDATE task SET task_id = 4 WHERE id = 3")
+        self.source.execute_query("DELETE FROM task WHERE id = 2")
+        self.source.execute_query("INSERT INTO task (customer, name, description, task_id) VALUES ('', 'late child', 'd', 1)")
+        for task_id, duration in ((1, "1,5h"), (3, "45 min"), (5, "")):
+            self.source.execute_query("INSERT INTO booking (description, started_at, duration, task_id) VALUES ('b', '2024-01-02T09:00:00', ?, ?)", (duration, task_id))
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.source.close()
+        self.directory.cleanup()
+
+    def round_trip(self, fmt):
+        Exporter(self.source).export(self.directory.name, fmt, ["task", "booking"])
+        target = Database(":memory:")
+        importer = Importer(target, chunk_size=2)
+        for table in ("task", "booking"):
+            result = importer.import_file(table, os.path.join(self.directory.name, f"{table}.{fmt}"))
+            self.assertEqual(result.rejected, [])
+        return target
+
+    def assertSameRows(self, target, query):
+        self.assertEqual(target.fetch_all(query), self.source.fetch_all(query))
+
+    def test_round_trip(self):
+        for fmt in ("jsonl", "csv"):
+            with self.subTest(fmt=fmt):
+                target = self.round_trip(fmt)
+                # Derived columns included, but for the report cache stamps
+                self.assertSameRows(target, "SELECT id, customer, name, description, started_at, finished_at, task_id, child_count, started_at_epoch, finished_at_epoch FROM task ORDER BY id")
+                self.assertSameRows(target, "SELECT * FROM booking ORDER BY id")
+                self.assertSameRows(target, "SELECT * FROM task_closure ORDER BY ancestor, descendant")
+                target.close()
+
+    def test_derived_columns_are_not_exported(self):
+        Exporter(self.source).export(self.directory.name, "csv", ["task", "booking"])
+        with open(os.path.join(self.directory.name, "task.csv"), encoding="utf-8") as f:
+            self.assertEqual(f.readline().strip(), "id,customer,name,description,started_at,finished_at,parent_id")
+        with open(os.path.join(self.directory.name, "booking.csv"), encoding="utf-8") as f:
+            self.assertEqual(f.readline().strip(), "id,task_id,description,started_at,ended_at,duration,origin_id")
+
+
+if __name__ == "__main__":
+    unittest.main()
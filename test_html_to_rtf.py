@@ -0,0 +1,17 @@
+import unittest
+
+from html_to_rtf import html_to_rtf
+
+
+class HtmlToRtfTest(unittest.TestCase):
+    def test_link(self):
+        rtf = html_to_rtf('<li><a href="https://tracker.example/1">BCS: ticket</a></li>')
+        self.assertIn('{\\field{\\*\\fldinst{HYPERLINK "https://tracker.example/1"}}{\\fldrslt{\\ul\\cf1 BCS: ticket}}}', rtf)
+
+    def test_quote_in_link_is_percent_encoded(self):
+        rtf = html_to_rtf('<a href="https://tracker.example/?q=&quot;x&quot;{y}">ticket</a>')
+        self.assertIn('HYPERLINK "https://tracker.example/?q=%22x%22\\{y\\}"}', rtf)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+
+from database import Database
+from importer import Importer
+
+
+def numbered(rows):
+    return list(enumerate(rows, 2))
+
+
+class ImporterTest(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(":memory:")
+        self.db.execute_query("INSERT INTO task (customer, name, description) VALUES ('ACME', 'existing', 'd')")
+
+    def tearDown(self):
+        self.db.close()
+
+    def parents(self):
+        return dict(self.db.fetch_all("SELECT t.name, p.name FROM task t LEFT JOIN task p ON p.id = t.task_id ORDER BY t.id"))
+
+    def test_parents_resolve_within_and_across_chunks(self):
+        rows = [
+            {"name": " root ", "parent": "existing"},
+            {"name": "child", "parent": "root "},
+            {"name": "other"},
+            {"name": "grandchild", "parent": " child"},
+            {"name": "late", "parent": "root"},
+        ]
+        result = Importer(self.db, chunk_size=2).import_rows("task", numbered(rows))
+        self.assertEqual((result.inserted, result.rejected), (5, []))
+        self.assertEqual(self.parents(), {"existing": None, "root": "existing", "child": "root", "other": None, "grandchild": "child", "late": "root"})
+        self.assertClosureDepth("grandchild", 3)
+
+    def assertClosureDepth(self, name, depth):
+        self.assertEqual(self.db.fetch_one("SELECT MAX(depth) FROM task_closure WHERE descendant = (SELECT id FROM task WHERE name = ?)", (name,))[0], depth)
+
+    def test_task_rejects(self):
+        rows = [
+            {"name": "ok"},
+            {"name": "x", "colour": "red"},
+            {"name": "  "},
+            {"name": "x", "started_at": "yesterday"},
+            {"name": "x", "parent_id": "abc"},
+            {"name": "x", "parent_id": "99"},
+            {"name": "x", "parent": "missing"},
+            ValueError("not a JSON object"),
+        ]
+        result = Importer(self.db).import_rows("task", numbered(rows))
+        self.assertEqual(result.read, 8)
+        self.assertEqual(result.inserted, 1)
+        self.assertEqual([(line, reason) for line, reason, row in result.rejected], [
+            (3, "unknown columns: colour"),
+            (4, "name is required"),
+            (5, "started_at is not an ISO date: yesterday"),
+            (6, "parent_id is not a number: abc"),
+            (7, "no task with id 99"),
+            (8, "no task named 'missing'"),
+            (9, "not a JSON object"),
+        ])
+
+    def test_booking_and_delivery_rejects(self):
+        result = Importer(self.db).import_rows("booking", numbered([{"description": "b"}, {"task": "existing", "duration": "1h"}]))
+        self.assertEqual((result.inserted, [reason for line, reason, row in result.rejected]), (1, ["task or task_id is required"]))
+        result = Importer(self.db).import_rows("delivery", numbered([{"task": "existing"}, {"task": "existing", "version": "1.0"}]))
+        self.assertEqual((result.inserted, [reason for line, reason, row in result.rejected]), (1, ["version is required"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+from collections import Counter
+
+from database import Database
+from report import ReportEngine
+
+
+def baseline_report(db, selected_items):
+    """The report as generate_report built it before ReportEngine, one query at a time."""
+    task_hierarchy = {task_id: [] for task_id in selected_items}
+    subtasks = []
+    for task_id in selected_items:
+        children = db.fetch_all("SELECT id FROM task WHERE task_id = ?", (task_id,))
+        filtered_children = [child[0] for child in children if child[0] in selected_items]
+        subtasks.extend(filtered_children)
+        if task_id in subtasks:
+            del task_hierarchy[task_id]
+        else:
+            task_hierarchy[task_id].extend(filtered_children)
+
+    report_lines = []
+    visited_tasks = set()
+
+    def add_task_to_report(task_id, indent_level=0):
+        if task_id in visited_tasks:
+            return
+        visited_tasks.add(task_id)
+        task = db.fetch_one("SELECT id, customer, name, description FROM task WHERE id = ?", (task_id,))
+        indent = "    " * indent_level
+        sub_indent = "    "
+        if task[1] != "":
+            report_lines.append(f"{indent}<p><strong>{task[1]}</strong>: <code>{task[2]}</code><p><ul>")
+        else:
+            report_lines.append(f"{indent}<li>Sub-task: <code>{task[2]}</code></li><ul>")
+        report_lines.append(f"{indent}{sub_indent}<li>Description: {task[3]}</li>")
+
+        deliveries = db.fetch_all("SELECT d.version, d.server, d.environment, d.delivery_date_time FROM delivery d JOIN task_delivery td ON d.id = td.delivery_id WHERE td.task_id = ?", (task_id,))
+        if deliveries:
+            report_lines.append(f"{indent}{sub_indent}<li>Deliveries:</li><ul>")
+            deliveries = sorted(deliveries, key=lambda row: (row[0], row[2]))
+            deliveries = [row for row in deliveries if row[2] != "PROD"] + [row for row in deliveries if row[2] == "PROD"]
+            last_version_and_server = None
+            close_list_tag = ""
+            for delivery in deliveries:
+                version_and_server = f"V {delivery[0]}, {delivery[1]}"
+                if version_and_server != last_version_and_server:
+                    report_lines.append(f"{close_list_tag}{indent}{sub_indent}{sub_indent}<li>{version_and_server}:</li><ul>")
+                    close_list_tag = "</ul>"
+                delivery_date = delivery[3][:-3].replace("T", " ").replace("-", ".").replace(":", "h")
+                report_lines.append(f"{indent}{sub_indent}{sub_indent}{sub_indent}<li>[x] {delivery[2]}, {delivery_date}")
+                last_version_and_server = version_and_server
+            report_lines.append("</ul></ul>")
+
+        for origin in db.fetch_all("SELECT o.name, o.type, o.raw_link FROM origin o JOIN task_origin t_o ON o.id = t_o.origin_id WHERE t_o.task_id = ?", (task_id,)):
+            report_lines.append(f"{indent}{sub_indent}<li><a href=\"{origin[2]}\">BCS: {origin[0]}</a></li>")
+
+        for child_id in task_hierarchy.get(task_id, []):
+            add_task_to_report(child_id, indent_level + 1)
+
+    for task_id in selected_items:
+        add_task_to_report(task_id)
+        report_lines.append("</ul>")
+    return "\n".join(report_lines)
+
+
+def content_lines(html):
+    """The report lines without their indentation, ignoring bare closing tags."""
+    return Counter(line.strip() for line in html.split("\n") if line.strip().replace("</ul>", ""))
+
+
+class ReportTest(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(":memory:")
+        # 1 ACME root > 2 child > 3 grandchild, 4 Initech root
+        for customer, name, parent in (("ACME", "root", None), ("", "child", 1), ("", "grandchild", 2), ("Initech", "other", None)):
+            self.db.execute_query("INSERT INTO task (customer, name, description, task_id) VALUES (?, ?, 'd', ?)", (customer, name, parent))
+        for task_id, version, environment in ((1, "1.0", "PROD"), (1, "1.0", "DEV"), (3, "2.0", "TEST"), (4, "1.1", "DEV")):
+            delivery_id = self.db.execute_query("INSERT INTO delivery (version, server, environment, delivery_date_time) VALUES (?, 'srv', ?, '2024-02-03T10:00:00')", (version, environment)).lastrowid
+            self.db.execute_query("INSERT INTO task_delivery (task_id, delivery_id) VALUES (?, ?)", (task_id, delivery_id))
+        origin_id = self.db.execute_query("INSERT INTO origin (name, type, raw_link) VALUES ('ticket', 'BCS', 'https://tracker.example/1')").lastrowid
+        self.db.execute_query("INSERT INTO task_origin (task_id, origin_id) VALUES (3, ?)", (origin_id,))
+
+    def tearDown(self):
+        self.db.close()
+
+    def generate(self, task_ids):
+        return ReportEngine(self.db, cache_size=0).generate(task_ids)
+
+    def test_root_tasks_match_baseline(self):
+        self.assertEqual(self.generate([1, 4]), baseline_report(self.db, [1, 4]))
+        self.assertEqual(self.generate([4, 1]), baseline_report(self.db, [4, 1]))
+
+    def test_parent_and_child_match_baseline_but_for_closing_tags(self):
+        # The baseline also closed a list after each selected subtask
+        self.assertEqual(self.generate([1, 2]), baseline_report(self.db, [1, 2]).replace("\n</ul>\n</ul>", "\n</ul>"))
+
+    def test_grandchild_is_nested(self):
+        # The baseline dropped the grandchild out of the tree to the top level;
+        # it is now nested under its selected parent, in any selection order
+        for selection in ([1, 2, 3], [3, 2, 1], [2, 1, 3]):
+            report = self.generate(selection)
+            self.assertEqual(content_lines(report), content_lines(baseline_report(self.db, selection)))
+            self.assertIn("        <li>Sub-task: <code>grandchild</code></li><ul>", report)
+        self.assertIn("\n<li>Sub-task: <code>grandchild</code></li><ul>", baseline_report(self.db, [1, 2, 3]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+
+from database import Database
+from report import ReportEngine
+
+
+class ReportCacheTest(unittest.TestCase):
+    """The cached report must match an uncached one after every kind of change."""
+
+    def setUp(self):
+        self.db = Database(":memory:")
+        self.task_ids = []
+        for customer, name, parent in (("ACME", "root", None), ("", "child", 1), ("", "grandchild", 2), ("Initech", "other", None)):
+            cursor = self.db.execute_query("INSERT INTO task (customer, name, description, started_at, task_id) VALUES (?, ?, 'd', '2024-01-01T10:00:00', ?)", (customer, name, parent))
+            self.task_ids.append(cursor.lastrowid)
+        for task_id, version, environment in ((1, "1.0", "DEV"), (2, "1.1", "PROD"), (3, "2.0", "TEST")):
+            self.add_delivery(task_id, version, environment)
+        for task_id, name in ((1, "ticket-1"), (3, "ticket-3")):
+            self.add_origin(task_id, name)
+        self.assertReportsMatch()  # Fills the cache
+
+    def tearDown(self):
+        self.db.close()
+
+    def add_delivery(self, task_id, version, environment):
+        delivery_id = self.db.execute_query("INSERT INTO delivery (version, server, environment, delivery_date_time) VALUES (?, 'srv', ?, '2024-02-03T10:00:00')", (version, environment)).lastrowid
+        self.db.execute_query("INSERT INTO task_delivery (task_id, delivery_id) VALUES (?, ?)", (task_id, delivery_id))
+        return delivery_id
+
+    def add_origin(self, task_id, name):
+        origin_id = self.db.execute_query("INSERT INTO origin (name, type, raw_link) VALUES (?, 'BCS', ?)", (name, f"https://tracker.example/{name}")).lastrowid
+        self.db.execute_query("INSERT INTO task_origin (task_id, origin_id) VALUES (?, ?)", (task_id, origin_id))
+        return origin_id
+
+    def assertReportsMatch(self):
+        cached = ReportEngine(self.db).generate(self.task_ids)
+        uncached = ReportEngine(self.db, cache_size=0).generate(self.task_ids)
+        self.assertEqual(cached, uncached)
+        return cached
+
+    def test_cache_is_used(self):
+        engine = ReportEngine(self.db)
+        engine.generate(self.task_ids)
+        self.assertEqual(engine.cached_tasks, (4, 4))
+
+    def test_task_insert(self):
+        cursor = self.db.execute_query("INSERT INTO task (customer, name, description, task_id) VALUES ('', 'new', 'd', 2)")
+        self.task_ids.append(cursor.lastrowid)
+        self.assertIn("new", self.assertReportsMatch())
+
+    def test_task_update(self):
+        self.db.execute_query("UPDATE task SET name = 'renamed', description = 'changed' WHERE id = 2")
+        self.assertIn("renamed", self.assertReportsMatch())
+        self.db.execute_query("UPDATE task SET customer = 'Umbrella' WHERE id = 3")
+        self.assertIn("Umbrella", self.assertReportsMatch())
+
+    def test_task_delete(self):
+        self.db.execute_query("DELETE FROM task WHERE id = 3")
+        self.assertNotIn("grandchild", self.assertReportsMatch())
+
+    def test_task_reparent(self):
+        self.db.execute_query("UPDATE task SET task_id = 4 WHERE id = 3")
+        self.assertReportsMatch()
+        self.db.execute_query("UPDATE task SET task_id = NULL WHERE id = 2")
+        self.assertReportsMatch()
+
+    def test_delivery_insert(self):
+        self.add_delivery(3, "3.0", "UAT")
+        self.assertIn("UAT", self.assertReportsMatch())
+
+    def test_delivery_update(self):
+        self.db.execute_query("UPDATE delivery SET version = '9.9' WHERE id = 2")
+        self.assertIn("V 9.9", self.assertReportsMatch())
+
+    def test_delivery_delete(self):
+        # As the GUI does it, leaving the task_delivery row behind
+        self.db.execute_query("DELETE FROM delivery WHERE id = 2")
+        self.assertNotIn("V 1.1", self.assertReportsMatch())
+
+    def test_delivery_unlink(self):
+        self.db.execute_query("DELETE FROM task_delivery WHERE delivery_id = 3")
+        self.assertNotIn("V 2.0", self.assertReportsMatch())
+
+    def test_delivery_relink(self):
+        self.db.execute_query("UPDATE task_delivery SET task_id = 4 WHERE delivery_id = 1")
+        self.assertReportsMatch()
+
+    def test_origin_insert(self):
+        self.add_origin(2, "ticket-2")
+        self.assertIn("ticket-2", self.assertReportsMatch())
+
+    def test_origin_update(self):
+        self.db.execute_query("UPDATE origin SET name = 'renamed-ticket' WHERE id = 1")
+        self.assertIn("renamed-ticket", self.assertReportsMatch())
+
+    def test_origin_delete(self):
+        # As the GUI does it, leaving the task_origin row behind
+        self.db.execute_query("DELETE FROM origin WHERE id = 2")
+        self.assertNotIn("ticket-3", self.assertReportsMatch())
+
+    def test_origin_unlink(self):
+        self.db.execute_query("DELETE FROM task_origin WHERE origin_id = 1")
+        self.assertNotIn("ticket-1", self.assertReportsMatch())
+
+    def test_environment_rank(self):
+        self.add_delivery(1, "1.0", "PROD")
+        self.assertReportsMatch()
+        self.db.set_environment_rank("DEV", 5)
+        self.assertReportsMatch()
+
+    def test_cache_size_is_bounded(self):
+        ReportEngine(self.db, cache_size=2).generate(self.task_ids)
+        self.assertEqual(self.db.fetch_one("SELECT COUNT(*) FROM report_cache")[0], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
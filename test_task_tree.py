@@ -0,0 +1,62 @@
+import unittest
+
+from database import Database
+
+
+class TaskTreeTest(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(":memory:")
+        # 1 root > 2 child > 3 grandchild > 4 great-grandchild, 5 other root
+        for name, parent in (("root", None), ("child", 1), ("grandchild", 2), ("great", 3), ("other", None)):
+            self.db.execute_query("INSERT INTO task (customer, name, description, task_id) VALUES ('ACME', ?, 'd', ?)", (name, parent))
+
+    def tearDown(self):
+        self.db.close()
+
+    def assertClosureMatchesParents(self):
+        expected = self.db.fetch_all("""
+        WITH RECURSIVE pair(ancestor, descendant, depth) AS (
+            SELECT id, id, 0 FROM task
+            UNION ALL
+            SELECT p.ancestor, t.id, p.depth + 1 FROM pair p JOIN task t ON t.task_id = p.descendant
+        )
+        SELECT ancestor, descendant, depth FROM pair ORDER BY ancestor, descendant""")
+        self.assertEqual(self.db.fetch_all("SELECT ancestor, descendant, depth FROM task_closure ORDER BY ancestor, descendant"), expected)
+
+    def test_insert_and_reparent(self):
+        self.assertClosureMatchesParents()
+        self.db.execute_query("UPDATE task SET task_id = 5 WHERE id = 3")
+        self.assertClosureMatchesParents()
+        self.assertEqual(self.db.fetch_task_descendants(5), [5, 3, 4])
+        self.db.execute_query("UPDATE task SET task_id = NULL WHERE id = 2")
+        self.assertClosureMatchesParents()
+
+    def test_deleting_a_task_makes_its_subtasks_roots(self):
+        self.db.execute_query("DELETE FROM task WHERE id = 2")
+        self.assertIsNone(self.db.fetch_one("SELECT task_id FROM task WHERE id = 3")[0])
+        self.assertClosureMatchesParents()
+        self.assertEqual(self.db.fetch_one("SELECT child_count FROM task WHERE id = 1")[0], 0)
+
+    def test_delete_task_tree(self):
+        for task_id in (2, 4, 5):
+            self.db.execute_query("INSERT INTO booking (description, duration, task_id) VALUES ('booked', '1h', ?)", (task_id,))
+            self.db.execute_query("INSERT INTO note (task_id, content) VALUES (?, 'noted')", (task_id,))
+            for table, join_table, column, values in (("delivery", "task_delivery", "delivery_id", "(version) VALUES ('1.0')"),
+                                                      ("link", "task_link", "link_id", "(type, raw_link) VALUES ('web', 'linked')"),
+                                                      ("tag", "tag_task", "tag_id", "(type, keywords) VALUES ('kind', 'tagged')"),
+                                                      ("origin", "task_origin", "origin_id", "(name) VALUES ('ticket')")):
+                row_id = self.db.execute_query(f"INSERT INTO {table} {values}").lastrowid
+                self.db.execute_query(f"INSERT INTO {join_table} (task_id, {column}) VALUES (?, ?)", (task_id, row_id))
+
+        self.assertEqual(self.db.delete_task_tree(2), 3)
+        self.assertEqual([row[0] for row in self.db.fetch_all("SELECT id FROM task ORDER BY id")], [1, 5])
+        self.assertClosureMatchesParents()
+        for table in ("booking", "note", "task_delivery", "task_link", "tag_task", "task_origin"):
+            self.assertEqual(self.db.fetch_all(f"SELECT DISTINCT task_id FROM {table}"), [(5,)], table)
+        for word in ("booked", "noted", "1.0", "linked", "tagged", "ticket"):
+            self.assertEqual({row[2] for row in self.db.search(word)}, {5}, word)
+        self.assertEqual({row[2] for row in self.db.search("ACME")}, {1, 5})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from database import Database
+from timesheet import TimesheetEngine
+
+
+class DurationParsingTest(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(":memory:")
+
+    def tearDown(self):
+        self.db.close()
+
+    def minutes(self, duration, started_at=None, ended_at=None):
+        booking_id = self.db.execute_query("INSERT INTO booking (description, started_at, ended_at, duration) VALUES ('b', ?, ?, ?)",
+                                           (started_at, ended_at, duration)).lastrowid
+        return self.db.fetch_one("SELECT duration_minutes FROM booking WHERE id = ?", (booking_id,))[0]
+
+    def test_durations(self):
+        for duration, minutes in (("1:30", 90), ("1h30", 90), ("1h30m", 90), ("1 h 30", 90), ("2h", 120),
+                                  ("1.5h", 90), ("0.5h", 30), ("1,5h", 90), ("1,25 H", 75),
+                                  ("45m", 45), ("45 min", 45), ("1.5", 90), ("1,5", 90), ("2", 120), (".5", 30)):
+            with self.subTest(duration=duration):
+                self.assertEqual(self.minutes(duration), minutes)
+
+    def test_unparseable_and_negative_durations_are_unknown(self):
+        for duration in ("abc", "-1", "-1h", "-0:30", "1:xx", "1..5", "h", "1h-5", "", "  ", None):
+            with self.subTest(duration=duration):
+                self.assertIsNone(self.minutes(duration))
+
+    def test_start_and_end_win_over_the_duration(self):
+        self.assertEqual(self.minutes("5h", "2024-01-01T10:00:00", "2024-01-01T11:15:00"), 75)
+        # Ended before it started: the duration text is used
+        self.assertEqual(self.minutes("0,5h", "2024-01-01T10:00:00", "2024-01-01T09:00:00"), 30)
+
+    def test_update_recomputes(self):
+        self.minutes("1h")
+        self.db.execute_query("UPDATE booking SET duration = '1,5h'")
+        self.assertEqual(self.db.fetch_one("SELECT duration_minutes FROM booking")[0], 90)
+
+
+class TimesheetTotalsTest(unittest.TestCase):
+    def setUp(self):
+        self.db = Database(":memory:")
+        for customer, parent in (("ACME", None), ("", 1), ("Initech", None)):
+            self.db.execute_query("INSERT INTO task (customer, name, description, task_id) VALUES (?, 'n', 'd', ?)", (customer, parent))
+        for task_id, started_at, duration in ((1, "2024-01-01T09:00:00", "1,5h"), (2, "2024-01-01T14:00:00", "0.5h"),
+                                              (3, "2024-01-02T09:00:00", "45 min"), (3, "2024-01-02T10:00:00", "soon")):
+            self.db.execute_query("INSERT INTO booking (description, started_at, duration, task_id) VALUES ('b', ?, ?, ?)", (started_at, duration, task_id))
+        self.engine = TimesheetEngine(self.db)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_by_customer_of_the_root_task(self):
+        self.assertEqual(self.engine.totals("customer"), [("ACME", 120, 2, 120, 72.7), ("Initech", 45, 1, 165, 27.3)])
+
+    def test_by_day(self):
+        self.assertEqual(self.engine.totals("day"), [("2024-01-01", 120, 2, 120, 72.7), ("2024-01-02", 45, 1, 165, 27.3)])
+        self.assertEqual(self.engine.totals("day", "2024-01-02", "2024-01-02"), [("2024-01-02", 45, 1, 45, 100.0)])
+
+    def test_bookings_without_a_start_are_dated_by_their_end(self):
+        self.db.execute_query("INSERT INTO booking (description, ended_at, duration) VALUES ('b', '2024-01-03T18:00:00', '1h')")
+        self.assertEqual(self.engine.totals("day", "2024-01-03", "2024-01-03"), [("2024-01-03", 60, 1, 60, 100.0)])
+
+    def test_iso_weeks_across_new_year(self):
+        self.db.execute_query("DELETE FROM booking")
+        for started_at in ("2020-12-31", "2021-01-03", "2021-01-04", "2024-12-29", "2024-12-30", "2025-01-01", "2026-12-31"):
+            self.db.execute_query("INSERT INTO booking (description, started_at, duration) VALUES ('b', ?, '1h')", (f"{started_at}T10:00:00",))
+        weeks = [(week, bookings) for week, _, bookings, _, _ in self.engine.totals("week")]
+        self.assertEqual(weeks, [("2020-W53", 2), ("2021-W01", 1), ("2024-W52", 1), ("2025-W01", 2), ("2026-W53", 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import csv
+
+
+# Bookings are dated by their start, or their end when the start is missing
+BOOKING_EPOCH = "COALESCE(b.started_at_epoch, b.ended_at_epoch)"
+
+# ISO 8601 weeks run Monday to Sunday and belong to the year of their
+# Thursday, so the week of 2024-12-30 is 2025-W01. SQLite only has %G and %V
+# from 3.46 on, the week is taken from the Thursday's day of the year instead.
+_WEEK_THURSDAY = f"date({BOOKING_EPOCH}, 'unixepoch', '-3 days', 'weekday 4')"
+_ISO_WEEK = f"strftime('%Y', {_WEEK_THURSDAY}) || printf('-W%02d', (strftime('%j', {_WEEK_THURSDAY}) - 1) / 7 + 1)"
+
+# Grouping key of a booking for each kind of total
+TIMESHEET_GROUPS = {
+    "day": f"COALESCE(date({BOOKING_EPOCH}, 'unixepoch'), '(no date)')",
+    "week": f"COALESCE({_ISO_WEEK}, '(no date)')",
+    "customer": "COALESCE(NULLIF(root.customer, ''), '(none)')",
+    "origin": "COALESCE(NULLIF(o.name, ''), '(none)')",
+}
+
+TIMESHEET_HEADINGS = ("group", "time", "bookings", "running total", "share %")
+
+
+def format_minutes(minutes):
+    """Minutes as H:MM, e.g. 90 -> 1:30."""
+    if minutes is None:
+        return ""
+    return f"{minutes // 60}:{minutes % 60:02d}"
+
+
+class TimesheetEngine:
+    """Booked time totals per day, week, customer or origin.
+
+    Durations come from booking.duration_minutes, kept up to date by triggers,
+    so a whole timesheet is one GROUP BY query. A customer is the one of the
+    root task the booking belongs to, subtasks usually have none of their own.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def totals(self, group_by, date_from=None, date_to=None):
+        """Return rows of (group, minutes, bookings, running minutes, share percent).
+
+        date_from and date_to are YYYY-MM-DD, both included.
+        """
+        if group_by not in TIMESHEET_GROUPS:
+            raise ValueError(f"Cannot group a timesheet by {group_by}")
+
+        clauses = ["b.duration_minutes IS NOT NULL"]
+        params = []
+        if date_from:
+            clauses.append(f"{BOOKING_EPOCH} >= CAST(strftime('%s', ?) AS INTEGER)")
+            params.append(date_from)
+        if date_to:
+            clauses.append(f"{BOOKING_EPOCH} < CAST(strftime('%s', ?, '+1 day') AS INTEGER)")
+            params.append(date_to)
+
+        return self.db.fetch_all(f"""
+        WITH grouped AS (
+            SELECT {TIMESHEET_GROUPS[group_by]} AS grouping, SUM(b.duration_minutes) AS minutes, COUNT(*) AS bookings
+            FROM booking b
+            LEFT JOIN task root ON root.id = (SELECT ancestor FROM task_closure WHERE descendant = b.task_id ORDER BY depth DESC LIMIT 1)
+            LEFT JOIN origin o ON o.id = b.origin_id
+            WHERE {' AND '.join(clauses)}
+            GROUP BY grouping
+        )
+        SELECT grouping, minutes, bookings,
+               SUM(minutes) OVER (ORDER BY grouping ROWS UNBOUNDED PRECEDING),
+               round(100.0 * minutes / SUM(minutes) OVER (), 1)
+        FROM grouped
+        ORDER BY grouping""", params)
+
+    def export_csv(self, path, group_by, date_from=None, date_to=None):
+        """Write the totals to a CSV file and return the number of rows."""
+        rows = self.totals(group_by, date_from, date_to)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow((group_by, "minutes", "time", "bookings", "running minutes", "share %"))
+            for grouping, minutes, bookings, running, share in rows:
+                writer.writerow((grouping, minutes, format_minutes(minutes), bookings, running, share))
+        return len(rows)